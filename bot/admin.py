@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from bot.models import TgUser
+from bot.models import ChatState, TgUser
 
 
 class TgUserAdmin(admin.ModelAdmin):
@@ -15,3 +15,17 @@ class TgUserAdmin(admin.ModelAdmin):
 
 
 admin.site.register(TgUser, TgUserAdmin)
+
+
+class ChatStateAdmin(admin.ModelAdmin):
+    """
+    Админка для состояний диалогов бота (ChatState) позволяет найти состояние по tg_chat_id и отфильтровать по шагу
+    диалога.
+    """
+    list_display = ("tg_chat_id", "state", "version", "expires_at")
+    search_fields = ("tg_chat_id",)
+    list_filter = ("state",)
+    readonly_fields = ("tg_chat_id", "version")
+
+
+admin.site.register(ChatState, ChatStateAdmin)
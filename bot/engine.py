@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from bot.tg.client import TgClient
+from bot.tg.dc import Message
+
+logger = logging.getLogger(__name__)
+
+
+class BotEngine:
+    """
+    Асинхронный движок бота. Обновления получаются long polling в отдельном потоке и раздаются по чатам: у каждого
+    чата своя очередь и задача-обработчик, поэтому сообщения одного чата обрабатываются строго по порядку, а разные
+    чаты - параллельно. Обработчик сообщения синхронный (ORM, отправка ответов) и выполняется в пуле из workers
+    потоков, цикл событий при этом не блокируется: медленный запрос к БД или отправка задерживают только свой чат.
+    Задача чата завершается после idle_timeout секунд без сообщений. Номер следующего обновления (offset)
+    подтверждается Телеграму сразу после раздачи, поэтому необработанные сообщения при остановке процесса теряются.
+    В режиме webhook движок работает без long polling: обновления передает ему bot.webhook.WebhookDispatcher.
+    """
+    # сообщения сверх лимита очереди чата отбрасываются, чтобы один чат не занял всю память
+    chat_queue_size = 100
+
+    def __init__(self, handle: Callable[[Message], None], tg_client: TgClient | None = None, workers: int = 32,
+                 idle_timeout: float = 60):
+        self.handle = handle
+        self.tg_client = tg_client
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-worker")
+        self.chats: dict[int, asyncio.Queue] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        offset = 0
+        logger.info("Bot started operating")
+        while True:
+            try:
+                response = await asyncio.to_thread(self.tg_client.get_updates, offset=offset)
+            except Exception:
+                logger.exception("Failed to fetch updates, retrying.")
+                await asyncio.sleep(1)
+                continue
+
+            for item in response.result:
+                logger.info("UpdateObj is %s", item)
+                offset = item["update_id"] + 1
+                self.dispatch(item)
+
+    def dispatch(self, update: dict) -> bool:
+        """
+        Ставит сообщение из обновления в очередь его чата, возвращает False, если сообщение не будет обработано.
+        """
+        message: Message | None = update.get("message") or update.get("edited_message")
+        if message is None:
+            return False
+        chat_id = message["chat"]["id"]
+
+        queue = self.chats.get(chat_id)
+        if queue is None:
+            queue = self.chats[chat_id] = asyncio.Queue(maxsize=self.chat_queue_size)
+            task = asyncio.create_task(self.chat_worker(chat_id, queue))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        if queue.full():
+            logger.warning("Chat %s queue is full, message dropped.", chat_id)
+            return False
+        queue.put_nowait(message)
+        return True
+
+    async def chat_worker(self, chat_id: int, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                # между проверкой и удалением нет await, поэтому новое сообщение не может потеряться
+                if queue.empty():
+                    del self.chats[chat_id]
+                    return
+                continue
+
+            try:
+                await sync_to_async(self.call_handler, thread_sensitive=False, executor=self.executor)(message)
+            except Exception:
+                logger.exception("Failed to handle message in chat %s.", chat_id)
+            finally:
+                queue.task_done()
+
+    def call_handler(self, message: Message) -> None:
+        # потоки пула не получают сигналов начала и конца запроса, поэтому соединения с БД закрываются здесь
+        close_old_connections()
+        try:
+            logger.info("Message is %s", message)
+            self.handle(message)
+            logger.info("Bot replied with message")
+        finally:
+            close_old_connections()
+
+    async def join(self) -> None:
+        """
+        Ожидает обработки всех полученных сообщений.
+        """
+        await asyncio.gather(*(queue.join() for queue in list(self.chats.values())))
@@ -0,0 +1,222 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from bot.models import ChatState, TgUser
+from bot.states import ChatStateStore, StaleChatState
+from bot.tg.client import TgClient
+from bot.tg.dc import Message
+from bot.tg.outbox import Outbox
+from goals.models import Goal
+
+logger = logging.getLogger(__name__)
+
+USER_NOT_IN_DB = "User is not authorized. Bot needs to generate Verification code and send to user."
+USER_IN_DB_NOT_AUTHORIZED = "User is in database but is not authorized. Bot provided verification code to user and " \
+                            "expects the user to link the Telegram user with DB user data via the Todolist" \
+                            " web application."
+GREETING_UNAUTH_USER = f"Greetings, User. Please, verify your account. For proper authorization " \
+                         "insert the verification code provided by the Telegram bot_testing into the application " \
+                         "while being logged in."
+USER_IS_AUTHORIZED = "User is authorized."
+
+BOT_SENDS_ALL_GOAL_TITLES = "Bot successfully sent the list of goal titles to the User."
+BOT_SENDS_ALL_CATEGORIES_TITLES = "Bot successfully sent all titles for goal categories to user and asked User " \
+                                  "to proceed with selecting a category."
+USER_CANCELLED_OPERATION = "User cancelled the operation by sending /cancel command to bot_testing."
+BOT_RECEIVED_UNKNOWN_COMMAND = "Bot received an unknown command from User. No actions performed."
+
+USER_INITIATED_GOAL_CREATION = "Bot received /create command from User to proceed with creation of a new goal."
+BOT_AWAITING_CATEGORY = "Bot expects category name from User from the list of available categories."
+USER_SELECTED_CATEGORY = "User successfully selected a category for the goal from the list of available categories."
+BOT_SAVED_CATEGORY = "Bot saved the selected category as first step in goal creation process."
+
+BOT_AWAITING_GOAL_TITLE = "Bot expects goal title from User."
+USER_SELECTED_GOAL_TITLE = "User provided goal title to bot_testing."
+BOT_SAVED_GOAL_TITLE = "Bot saved the goal title as part of goal creation process."
+BOT_CREATED_NEW_GOAL = "Bot created the goal and saved goal data in the database. Bot provided link to Web " \
+                       "app to User."
+BOT_CLEARED_DATA = "Bot reset the chat state upon creating the goal."
+
+
+class MessageHandler:
+    """
+    Осуществляет взаимодействие с пользователем в чате Телеграм. Функции-хэндлеры осуществляют работу с пользователем
+    в зависимости от состояний, демонстрируемых сообщениями в процессе логирования: для аутентификации и связывания
+    аккаунта Телеграм пользователя и пользователя в БД бот высылает код верификации пользователю, после чего ожидает от
+    подтвержденного пользователя команды для работы с целями в веб-приложении. В зависимости от команды пользователя бот реагирует
+    отправкой соответствующего ответного сообщения. Процесс создания Цели в приложении осуществляется путем сохранения
+    шага диалога и выбранной категории в состоянии чата (ChatStateStore), которое заполняется последовательно на
+    основе получаемых от пользователя в чате данных. Состояние у каждого чата свое; если его параллельно изменил другой
+    процесс бота, сообщение обрабатывается заново.
+    Ответы на одно сообщение пользователя отправляются через Outbox одним пакетом: строки объединяются в как можно
+    меньшее число сообщений Телеграм.
+    """
+    def __init__(self, outbox: Outbox, states: ChatStateStore):
+        self.outbox = outbox
+        self.states = states
+
+    @classmethod
+    def from_settings(cls, tg_client: TgClient) -> "MessageHandler":
+        """
+        Создает обработчик с запущенной очередью ответов и хранилищем состояний чатов по настройкам проекта.
+        """
+        outbox = Outbox(tg_client, global_rate=settings.BOT_SEND_RATE, chat_rate=settings.BOT_CHAT_SEND_RATE,
+                        senders=settings.BOT_SENDERS).start()
+        states = ChatStateStore(ttl=settings.BOT_STATE_TTL, lru_size=settings.BOT_STATE_LRU_SIZE)
+        return cls(outbox, states)
+
+    def handle_message(self, message: Message):
+        msg_chat_id: int = message["chat"]["id"]
+
+        msg_echo_text: str = message["text"]
+        tg_username = message["chat"]["username"]
+
+        tg_user, created = TgUser.objects.get_or_create(tg_chat_id=msg_chat_id)
+        logger.info("Created: %s" " for tg_chat_id %s", created, msg_chat_id)
+
+        for attempt in range(2):
+            with self.outbox.batch() as replies:
+                try:
+                    if tg_user.user:
+                        self.handle_authorized_user(tg_user=tg_user, message=message)
+
+                    else:
+                        self.handle_unauthorized_user(tg_user=tg_user, message=message)
+                    return
+                except StaleChatState:
+                    # ответы первой попытки не отправляем, сообщение обрабатывается заново
+                    replies.clear()
+                    if attempt:
+                        raise
+                    logger.info("Chat state of %s changed concurrently, handling the message again.", msg_chat_id)
+
+    def handle_unauthorized_user(self, tg_user: TgUser, message: Message):
+        logger.info(USER_NOT_IN_DB)
+        msg_chat_id = message["chat"]["id"]
+
+        self.outbox.send(chat_id=msg_chat_id, text=GREETING_UNAUTH_USER)
+
+        tg_username = message["chat"]["username"]
+        updated_username = tg_user.assign_tg_username(username=tg_username)
+
+        verification_code = tg_user.assign_verification_code()
+        verification_msg = f"Verification code: {verification_code}"
+        tg_user.save()
+
+        self.outbox.send(chat_id=msg_chat_id, text=verification_msg)
+        logger.info(USER_IN_DB_NOT_AUTHORIZED)
+
+    def handle_authorized_user(self, tg_user: TgUser, message: Message):
+        logger.info(USER_IS_AUTHORIZED)
+        tg_username = message["chat"]["username"]
+        msg_chat_id = message["chat"]["id"]
+        msg_text = message["text"]
+
+        msg_auth_greeting = f"{tg_username}, бот ожидает информацию."
+        self.outbox.send(chat_id=msg_chat_id, text=msg_auth_greeting)
+
+        allowed_commands = ["/goals", "/create", "/cancel"]
+
+        chat_state = self.states.get(msg_chat_id)
+        logger.info("Chat state is %s", chat_state)
+
+        if "/goals" in msg_text:
+            self.handle_goals(tg_user=tg_user, message=message)
+            logger.info(BOT_SENDS_ALL_GOAL_TITLES)
+
+        elif "/cancel" in msg_text:
+            self.states.reset(chat_state)
+            self.outbox.send(chat_id=msg_chat_id, text="Операция отменена")
+            logger.info(USER_CANCELLED_OPERATION)
+
+        elif chat_state.state == ChatState.State.idle and (msg_text not in allowed_commands):
+            self.outbox.send(chat_id=msg_chat_id, text="Неизвестная команда")
+            logger.info(BOT_RECEIVED_UNKNOWN_COMMAND)
+
+        elif "/create" in msg_text:
+            logger.info(USER_INITIATED_GOAL_CREATION)
+            self.outbox.send(chat_id=msg_chat_id, text="Список ваших категорий ниже.")
+
+            goal_categories_data = self.handle_db_categories(tg_user=tg_user)
+            for category_item in goal_categories_data:
+                category_ = f"{category_item[0]} - {category_item[1]}"
+                self.outbox.send(chat_id=msg_chat_id, text=category_)
+            self.outbox.send(chat_id=msg_chat_id, text="Выберите категорию для новой цели.")
+            logger.info(BOT_SENDS_ALL_CATEGORIES_TITLES)
+
+            if chat_state.state == ChatState.State.idle:
+                chat_state.state = ChatState.State.awaiting_category
+                self.states.save(chat_state)
+                logger.info(BOT_AWAITING_CATEGORY)
+
+        elif chat_state.state == ChatState.State.awaiting_category:
+            category = self.handle_save_category(tg_user=tg_user, message=message)
+            if category:
+                chat_state.state = ChatState.State.awaiting_goal_title
+                chat_state.data = {"category_id": category.pk}
+                self.states.save(chat_state)
+                logger.info(BOT_SAVED_CATEGORY)
+                logger.info(BOT_AWAITING_GOAL_TITLE)
+                self.outbox.send(chat_id=msg_chat_id, text="Категория выбрана. Введите заголовок цели.")
+
+        elif chat_state.state == ChatState.State.awaiting_goal_title:
+            logger.info(BOT_SAVED_GOAL_TITLE)
+            category = tg_user.show_user_goal_categories().filter(pk=chat_state.data["category_id"]).first()
+
+            # цель создается в одной транзакции со сбросом состояния: при параллельном изменении состояния другим
+            # процессом транзакция откатывается, и цель не создается дважды
+            with transaction.atomic():
+                self.states.reset(chat_state)
+                if category:
+                    Goal.objects.create(title=msg_text, user=tg_user.user, category=category)
+            logger.info(BOT_CLEARED_DATA)
+
+            if category:
+                self.outbox.send(chat_id=msg_chat_id,
+                                 text="Цель создана в БД. Ссылка на приложение: http://127.0.0.1")
+                logger.info(BOT_CREATED_NEW_GOAL)
+            else:
+                self.outbox.send(chat_id=msg_chat_id, text="Категория не найдена. Начните заново с команды /create")
+
+    def handle_save_category(self, tg_user: TgUser, message: Message):
+        msg_text = message["text"]
+        msg_chat_id = message["chat"]["id"]
+
+        goal_categories_data = self.handle_db_categories(tg_user=tg_user)
+        user_categories = tg_user.show_user_goal_categories()
+        for item in goal_categories_data:
+            if msg_text in str(item[0]):
+                category_id = msg_text
+                category_data = user_categories.get(pk=category_id)
+                return category_data
+
+        self.outbox.send(chat_id=msg_chat_id, text="Ошибка. Введите корректную категорию.")
+
+    def handle_goals(self, tg_user: TgUser, message: Message):
+        msg_text = message["text"]
+        msg_chat_id = message["chat"]["id"]
+        self.outbox.send(chat_id=msg_chat_id, text="Список ваших целей ниже.")
+        goals_data = self.handle_db_goals(tg_user=tg_user)
+
+        for goal_item in goals_data:
+            self.outbox.send(chat_id=msg_chat_id, text=goal_item)
+        self.outbox.send(chat_id=msg_chat_id,
+                         text="Для создания новой цели, используйте команду /create")
+
+    def handle_db_categories(self, tg_user: TgUser):
+        user_categories = tg_user.show_user_goal_categories()
+
+        categories_data_list = []
+        for category_item in user_categories:
+            categories_data_list.append([category_item.id, category_item.title])
+        return categories_data_list
+
+    def handle_db_goals(self, tg_user: TgUser):
+        user_goals = tg_user.show_user_goals()
+
+        goals_titles = []
+        for goal_item in user_goals:
+            goals_titles.append(goal_item.title)
+        return goals_titles
@@ -0,0 +1,58 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from bot.engine import BotEngine
+from bot.tg.client import TgClient
+from bot.tg.dc import Message
+from bot.tg.fake_server import FakeTelegramServer
+
+
+class Command(BaseCommand):
+    """
+    Замеряет пропускную способность транспорта и движка бота без доступа к Телеграму: поднимает FakeTelegramServer с
+    заданной задержкой и долей ошибок, отправляет в него по --messages сообщений от --chats пользователей, получает их
+    через getUpdates и обрабатывает движком BotEngine, который отвечает на каждое сообщение через TgClient.
+    Выводит число сообщений в секунду, перцентили задержки ответа и число запросов к серверу с учетом повторов.
+    """
+    help = "Benchmarks the bot engine and Telegram transport against a local fake Bot API server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chats", type=int, default=1000, help="Users sending messages at once.")
+        parser.add_argument("--messages", type=int, default=1, help="Messages per user.")
+        parser.add_argument("--workers", type=int, default=32, help="Bot engine threads.")
+        parser.add_argument("--latency", type=float, default=0.05, help="Fake server response delay in seconds.")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake 502 responses.")
+
+    def handle(self, *args, **options):
+        with FakeTelegramServer(latency=options["latency"], failure_rate=options["failure_rate"]) as server:
+            tg_client = TgClient(token="bench", base_url=server.url, backoff=0.05, pool_size=options["workers"])
+
+            def reply(message: Message) -> None:
+                tg_client.get_send_message(chat_id=message["chat"]["id"], text=f"echo {message['text']}")
+
+            engine = BotEngine(reply, tg_client=tg_client, workers=options["workers"])
+            for index in range(options["messages"]):
+                for chat_id in range(1, options["chats"] + 1):
+                    server.add_update(chat_id, f"message {index}")
+
+            async def run():
+                response = await asyncio.to_thread(tg_client.get_updates, offset=0, timeout=0)
+                for item in response.result:
+                    engine.dispatch(item)
+                await engine.join()
+
+            started = time.perf_counter()
+            asyncio.run(run())
+            elapsed = time.perf_counter() - started
+            engine.executor.shutdown()
+
+            latencies = sorted((message["sent_at"] - started) * 1000 for message in server.sent)
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{len(server.sent)} replies in {elapsed:.2f} s ({len(server.sent) / elapsed:.1f} msg/s), "
+                f"p50 {percentiles[49]:.0f} ms, p95 {percentiles[94]:.0f} ms, p99 {percentiles[98]:.0f} ms, "
+                f"{server.requests} requests to the server"
+            )
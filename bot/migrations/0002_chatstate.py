@@ -0,0 +1,28 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tg_chat_id', models.BigIntegerField(unique=True, verbose_name='Чат Телеграм')),
+                ('state', models.PositiveSmallIntegerField(choices=[(1, 'Ожидает команду'), (2, 'Ожидает категорию'), (3, 'Ожидает заголовок цели')], default=1, verbose_name='Состояние')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Данные диалога')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Версия')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+            ],
+            options={
+                'verbose_name': 'Состояние чата',
+                'verbose_name_plural': 'Состояния чатов',
+            },
+        ),
+    ]
@@ -26,8 +26,7 @@ class TgUser(models.Model):
         return code
 
     def show_user_goals(self):
-        user_goals = Goal.objects.filter(category__board__participants__user=self.user,
-                                         category__is_deleted=False).exclude(status=Goal.Status.archived)
+        user_goals = Goal.objects.visible_to(self.user)
         return user_goals
 
     def show_user_goal_categories(self):
@@ -53,3 +52,27 @@ class TgUser(models.Model):
     def __str__(self):
         return f"Чат id: {self.tg_chat_id}, username пользователя в Телеграм: {self.tg_username}"
 
+
+class ChatState(models.Model):
+    """
+    Состояние диалога с ботом в конкретном чате Телеграм: шаг сценария создания цели и данные, собранные на
+    предыдущих шагах. Запись действует до expires_at, после чего диалог начинается заново. Поле version увеличивается
+    при каждом сохранении и защищает от перезаписи состояния, измененного параллельно другим процессом бота.
+    """
+    class State(models.IntegerChoices):
+        idle = 1, "Ожидает команду"
+        awaiting_category = 2, "Ожидает категорию"
+        awaiting_goal_title = 3, "Ожидает заголовок цели"
+
+    tg_chat_id = models.BigIntegerField(verbose_name="Чат Телеграм", unique=True)
+    state = models.PositiveSmallIntegerField(verbose_name="Состояние", choices=State.choices, default=State.idle)
+    data = models.JSONField(verbose_name="Данные диалога", default=dict, blank=True)
+    version = models.PositiveIntegerField(verbose_name="Версия", default=0)
+    expires_at = models.DateTimeField(verbose_name="Действует до", db_index=True)
+
+    class Meta:
+        verbose_name = "Состояние чата"
+        verbose_name_plural = "Состояния чатов"
+
+    def __str__(self):
+        return f"Чат id: {self.tg_chat_id}, состояние: {self.get_state_display()}"
@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from bot.models import ChatState
+
+
+class StaleChatState(Exception):
+    """
+    Состояние чата было изменено другим процессом бота после того, как его прочитали: сообщение нужно обработать
+    заново с актуальным состоянием.
+    """
+
+
+class ChatStateStore:
+    """
+    Хранилище состояний диалогов по tg_chat_id. Состояния хранятся в таблице ChatState и действуют ttl секунд с
+    последнего изменения. Перед БД стоит ограниченный LRU-кэш процесса на lru_size чатов: при чтении активного чата
+    из БД запрашивается только версия записи, и состояние берется из кэша, если версия совпала. Если состояние
+    изменил другой процесс бота, например при доставке через webhook на несколько воркеров, версии различаются, и
+    состояние перечитывается из БД. Каждое сохранение тоже проверяет версию (compare-and-set): если состояние
+    изменили между чтением и сохранением, сохранение поднимает StaleChatState, запись удаляется из кэша, и сообщение
+    обрабатывается заново.
+    """
+
+    def __init__(self, ttl: int = 3600, lru_size: int = 10000):
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.lru: OrderedDict[int, ChatState] = OrderedDict()
+        self.lock = threading.Lock()
+        self.purged = time.monotonic()
+
+    def get(self, chat_id: int) -> ChatState:
+        with self.lock:
+            chat_state = self.lru.get(chat_id)
+            if chat_state is not None:
+                self.lru.move_to_end(chat_id)
+
+        # кэш другого процесса не видит чужих сохранений, поэтому кэшированная запись сверяется с версией в БД
+        if chat_state is not None and chat_state.version != self.get_version(chat_id):
+            chat_state = None
+        if chat_state is None:
+            chat_state = ChatState.objects.filter(tg_chat_id=chat_id).first()
+        if chat_state is None or chat_state.expires_at <= timezone.now():
+            chat_state = self.new(chat_id, chat_state)
+        self.remember(chat_state)
+        # вызывающий код меняет объект, а в кэше должна оставаться сохраненная версия
+        return copy.deepcopy(chat_state)
+
+    @staticmethod
+    def get_version(chat_id: int) -> int:
+        # у еще не сохраненного состояния версия 0, как у записи по умолчанию
+        version = ChatState.objects.filter(tg_chat_id=chat_id).values_list("version", flat=True).first()
+        return 0 if version is None else version
+
+    @staticmethod
+    def new(chat_id: int, expired: ChatState | None = None) -> ChatState:
+        # у истекшего состояния сохраняем pk и версию, чтобы следующее сохранение перезаписало запись
+        chat_state = ChatState(tg_chat_id=chat_id, expires_at=timezone.now())
+        if expired is not None:
+            chat_state.pk, chat_state.version = expired.pk, expired.version
+        return chat_state
+
+    def save(self, chat_state: ChatState) -> None:
+        expires_at = timezone.now() + timedelta(seconds=self.ttl)
+        if chat_state.pk is None:
+            try:
+                with transaction.atomic():
+                    created = ChatState.objects.create(tg_chat_id=chat_state.tg_chat_id, state=chat_state.state,
+                                                       data=chat_state.data, version=1, expires_at=expires_at)
+            except IntegrityError:
+                self.stale(chat_state)
+            chat_state.pk = created.pk
+            self.purge_expired()
+        else:
+            updated = ChatState.objects.filter(pk=chat_state.pk, version=chat_state.version).update(
+                state=chat_state.state, data=chat_state.data, version=chat_state.version + 1, expires_at=expires_at
+            )
+            if not updated:
+                self.stale(chat_state)
+        chat_state.version += 1
+        chat_state.expires_at = expires_at
+        self.remember(copy.deepcopy(chat_state))
+
+    def reset(self, chat_state: ChatState) -> None:
+        """
+        Возвращает чат в начальное состояние.
+        """
+        chat_state.state = ChatState.State.idle
+        chat_state.data = {}
+        if chat_state.pk is not None:
+            self.save(chat_state)
+
+    def stale(self, chat_state: ChatState):
+        self.evict(chat_state.tg_chat_id)
+        raise StaleChatState(chat_state.tg_chat_id)
+
+    def remember(self, chat_state: ChatState) -> None:
+        with self.lock:
+            self.lru[chat_state.tg_chat_id] = chat_state
+            self.lru.move_to_end(chat_state.tg_chat_id)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def evict(self, chat_id: int) -> None:
+        with self.lock:
+            self.lru.pop(chat_id, None)
+
+    def purge_expired(self) -> None:
+        # истекшие записи удаляются не чаще раза за ttl, проверка идет при создании новых записей
+        if time.monotonic() - self.purged < self.ttl:
+            return
+        self.purged = time.monotonic()
+        ChatState.objects.filter(expires_at__lte=timezone.now()).delete()
@@ -1,41 +1,99 @@
 import logging
+import random
+import time
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 from bot.tg.dc import GetUpdatesResponse, SendMessageResponse
 
 logger = logging.getLogger(__name__)
 
 
+class TgClientError(Exception):
+    """
+    Ошибка Bot API, которую нельзя исправить повтором запроса (неверный токен, чат не найден и т.п.), или исчерпанные
+    попытки при временных ошибках.
+    """
+    def __init__(self, method: str, description: str, error_code: int | None = None):
+        super().__init__(f"{method}: {description}")
+        self.method = method
+        self.description = description
+        self.error_code = error_code
+
+
 class TgClient:
     """
     Хранит информацию по токену для Телеграм бота, использует long polling подход для обработки сообщений пользователя
     в чате, отправляет ответные сообщения в чате пользователю.
+    Запросы идут методом POST с JSON-телом через общую сессию requests с пулом keep-alive соединений (до pool_size
+    соединений для параллельных потоков). Ответы 5xx и 429 повторяются до retries раз с экспоненциальной задержкой со
+    случайным разбросом; для 429 выдерживается пауза retry_after из ответа Телеграма. Сетевые ошибки повторяются так же
+    для методов из idempotent_methods, а для остальных (например, sendMessage, чтобы не отправить сообщение дважды)
+    только ошибки соединения. Остальные ошибки Bot API сразу поднимают TgClientError.
     """
-    def __init__(self, token: str | None = None):
+    timeout = 10
+    max_retry_after = 60
+    idempotent_methods = {"getUpdates", "getMe", "getWebhookInfo", "setWebhook", "deleteWebhook"}
+
+    def __init__(self, token: str | None = None, base_url: str | None = None, retries: int = 3,
+                 backoff: float = 0.5, pool_size: int | None = None):
         self.token = token if token else settings.BOT_TELEGRAM_TOKEN
         # импортируем телеграм токен из django.conf settings
+        self.base_url = (base_url or settings.BOT_API_URL).rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+
+        pool_size = pool_size or settings.BOT_WORKERS
+        self.session = requests.Session()
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
 
     def get_url(self, method: str) -> str:
-        return f"https://api.telegram.org/bot{self.token}/{method}"
+        return f"{self.base_url}/bot{self.token}/{method}"
 
-    def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
-        url = self.get_url("getUpdates")
-        response = requests.get(url, params={"offset": offset, "timeout": timeout})
-        if not response.ok:
-            logger.info("Failed to obtain response data.")
-            raise NotImplementedError
+    def get_delay(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def call(self, method: str, request_timeout: float | None = None, **params) -> dict:
+        url = self.get_url(method)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=params, timeout=request_timeout or self.timeout)
+            except requests.RequestException as error:
+                # без ответа нельзя понять, выполнил ли Телеграм запрос (например, при ReadTimeout), поэтому
+                # неидемпотентные методы повторяются, только если соединение не было установлено
+                retryable = method in self.idempotent_methods or isinstance(error, requests.ConnectionError)
+                if not retryable or attempt == self.retries:
+                    raise TgClientError(method, f"Request failed: {error}") from error
+                delay = self.get_delay(attempt)
+                logger.warning("%s request failed (%s), retrying in %.1f s.", method, error, delay)
+            else:
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = {"ok": False, "description": response.reason}
+                if response.ok and data.get("ok"):
+                    return data
+
+                description = data.get("description", response.reason)
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if not retryable or attempt == self.retries:
+                    raise TgClientError(method, description, data.get("error_code", response.status_code))
+                retry_after = (data.get("parameters") or {}).get("retry_after")
+                delay = self.get_delay(attempt) if retry_after is None else min(retry_after, self.max_retry_after)
+                logger.warning("%s failed with %s (%s), retrying in %.1f s.", method, response.status_code,
+                               description, delay)
 
-        data = response.json()
+            time.sleep(delay)
+            attempt += 1
+
+    def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
+        # запрос long polling длится до timeout секунд, поэтому ждем ответ чуть дольше
+        data = self.call("getUpdates", request_timeout=timeout + self.timeout, offset=offset, timeout=timeout)
         return GetUpdatesResponse(**data)
 
     def get_send_message(self, chat_id: int, text: str) -> SendMessageResponse:
-        url = self.get_url("sendMessage")
-        response = requests.get(url, params={"chat_id": chat_id, "text": text})
-        if not response.ok:
-            logger.info("Failed to obtain response data.")
-            raise NotImplementedError
-
-        data = response.json()
+        data = self.call("sendMessage", chat_id=chat_id, text=text)
         return SendMessageResponse(**data)
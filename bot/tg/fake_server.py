@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METHOD_PATH = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+
+
+class FakeTelegramServer:
+    """
+    Локальная замена Bot API для тестов и замеров без доступа к Телеграму. Поддерживает getUpdates (с ожиданием
+    новых обновлений до timeout секунд, как long polling) и sendMessage, сохраняет отправленные сообщения в sent.
+    setWebhook и deleteWebhook меняют webhook; пока он задан, getUpdates, как и в Телеграме, отвечает 409.
+    Ошибки задаются явно через fail() (например, 429 с retry_after или 500) или случайно с вероятностью
+    failure_rate (ответ 502), latency добавляет задержку к каждому ответу.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.updates: list[dict] = []
+        self.sent: list[dict] = []
+        self.failures: list[tuple[int, dict]] = []
+        self.requests = 0
+        self.next_update_id = 1
+        self.webhook: dict | None = None
+        self.condition = threading.Condition()
+
+        self.httpd = ThreadingHTTPServer((host, port), FakeTelegramHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTelegramServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fake-telegram", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeTelegramServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def add_update(self, chat_id: int, text: str, username: str = "fake_user") -> dict:
+        with self.condition:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+            chat = {"id": chat_id, "first_name": username, "username": username, "type": "private"}
+            update = {"update_id": update_id, "message": {
+                "message_id": update_id, "from": {**chat, "is_bot": False}, "chat": chat,
+                "date": int(time.time()), "text": text,
+            }}
+            self.updates.append(update)
+            self.condition.notify_all()
+        return update
+
+    def fail(self, status: int, description: str = "Fake failure", retry_after: int | None = None,
+             times: int = 1) -> None:
+        body = {"ok": False, "error_code": status, "description": description}
+        if retry_after is not None:
+            body["parameters"] = {"retry_after": retry_after}
+        with self.condition:
+            self.failures.extend([(status, body)] * times)
+
+    def handle(self, method: str, params: dict) -> tuple[int, dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self.condition:
+            self.requests += 1
+            if self.failures:
+                return self.failures.pop(0)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+
+        if method == "setWebhook":
+            self.webhook = params
+            return 200, {"ok": True, "result": True}
+        if method == "deleteWebhook":
+            self.webhook = None
+            return 200, {"ok": True, "result": True}
+        if method == "getUpdates" and self.webhook:
+            return 409, {"ok": False, "error_code": 409,
+                         "description": "Conflict: can't use getUpdates method while webhook is active"}
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": self.get_updates(int(params.get("offset", 0)),
+                                                                float(params.get("timeout", 0)))}
+        if method == "sendMessage":
+            with self.condition:
+                message = {"message_id": len(self.sent) + 1, "chat": {"id": params.get("chat_id")},
+                           "date": int(time.time()), "text": params.get("text")}
+                self.sent.append({**message, "sent_at": time.perf_counter()})
+            return 200, {"ok": True, "result": message}
+        return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+
+    def get_updates(self, offset: int, timeout: float) -> list[dict]:
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                # как и Телеграм, забываем обновления, получение которых подтверждено offset
+                self.updates = [update for update in self.updates if update["update_id"] >= offset]
+                remaining = deadline - time.monotonic()
+                if self.updates or remaining <= 0:
+                    return list(self.updates)
+                self.condition.wait(remaining)
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        match = METHOD_PATH.match(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            params = None
+
+        if match is None or not isinstance(params, dict):
+            status, body = 400, {"ok": False, "error_code": 400, "description": "Bad Request"}
+        else:
+            status, body = self.server.fake.handle(match["method"], params)
+
+        content = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            # клиент не дождался ответа (истек таймаут запроса), хотя запрос, как бывает и в Телеграме, уже выполнен
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
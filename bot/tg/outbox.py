@@ -0,0 +1,198 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from bot.tg.client import TgClient, TgClientError
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+
+
+def pack_lines(lines: list[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    Собирает строки в как можно меньшее число сообщений не длиннее limit символов, строки разделяются переводом
+    строки. Строка длиннее limit разбивается на части.
+    """
+    messages, current = [], ""
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты: rate токенов в секунду, не больше capacity подряд. take() резервирует токен и возвращает,
+    сколько секунд нужно подождать до его появления.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_full(self) -> bool:
+        with self.lock:
+            return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+class Outbox:
+    """
+    Очередь исходящих сообщений бота. Ответы, отправленные внутри batch(), собираются и упаковываются в как можно
+    меньшее число сообщений до 4096 символов, поэтому список из сотен целей уходит несколькими сообщениями вместо
+    сотен. Сообщения отправляют senders потоков: сообщения одного чата - строго по порядку и не чаще chat_rate в
+    секунду (чат обрабатывается одним потоком за раз), все чаты вместе - не чаще global_rate в секунду, как
+    рекомендует Телеграм. metrics() возвращает глубину очереди, число отправленных и неотправленных сообщений и
+    задержку от постановки в очередь до отправки, раз в metrics_interval секунд метрики пишутся в лог.
+    """
+    latency_window = 1000
+
+    def __init__(self, tg_client: TgClient, global_rate: float = 30, chat_rate: float = 1, chat_burst: int = 3,
+                 senders: int = 8, metrics_interval: float = 60):
+        self.tg_client = tg_client
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.senders = senders
+        self.metrics_interval = metrics_interval
+
+        self.local = threading.local()
+        self.condition = threading.Condition()
+        self.pending: dict[int, deque] = {}
+        self.ready: deque[int] = deque()
+        self.busy: set[int] = set()
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.latencies: deque[float] = deque(maxlen=self.latency_window)
+        self.logged = time.monotonic()
+        self.threads: list[threading.Thread] = []
+
+    def start(self) -> "Outbox":
+        for index in range(self.senders):
+            thread = threading.Thread(target=self.run_sender, name=f"bot-sender-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    @contextmanager
+    def batch(self):
+        """
+        Собирает все сообщения, отправленные в блоке, и ставит их в очередь упакованными при выходе из блока. Возвращает
+        словарь собранных строк по чатам: очистив его, можно отменить отправку.
+        """
+        if (batch := getattr(self.local, "batch", None)) is not None:
+            yield batch
+            return
+        self.local.batch = batch = {}
+        try:
+            yield batch
+        finally:
+            self.local.batch = None
+            for chat_id, lines in batch.items():
+                self.enqueue(chat_id, pack_lines(lines))
+
+    def send(self, chat_id: int, text: str) -> None:
+        batch = getattr(self.local, "batch", None)
+        if batch is not None:
+            batch.setdefault(chat_id, []).append(text)
+        else:
+            self.enqueue(chat_id, pack_lines([text]))
+
+    def enqueue(self, chat_id: int, messages: list[str]) -> None:
+        now = time.perf_counter()
+        with self.condition:
+            queue = self.pending.setdefault(chat_id, deque())
+            if not queue and chat_id not in self.busy:
+                self.ready.append(chat_id)
+            queue.extend((text, now) for text in messages)
+            self.depth += len(messages)
+            self.condition.notify_all()
+
+    def run_sender(self) -> None:
+        while True:
+            with self.condition:
+                while not self.ready:
+                    self.condition.wait()
+                chat_id = self.ready.popleft()
+                text, enqueued = self.pending[chat_id].popleft()
+                self.busy.add(chat_id)
+                bucket = self.chat_buckets.get(chat_id)
+                if bucket is None:
+                    bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+
+            time.sleep(bucket.take())
+            time.sleep(self.global_bucket.take())
+            try:
+                self.tg_client.get_send_message(chat_id=chat_id, text=text)
+                sent = True
+            except TgClientError:
+                logger.exception("Failed to send a message to chat %s.", chat_id)
+                sent = False
+
+            with self.condition:
+                self.depth -= 1
+                self.busy.discard(chat_id)
+                if sent:
+                    self.sent += 1
+                    self.latencies.append(time.perf_counter() - enqueued)
+                else:
+                    self.failed += 1
+                if self.pending[chat_id]:
+                    self.ready.append(chat_id)
+                else:
+                    del self.pending[chat_id]
+                    # заполненный ограничитель ничем не отличается от нового, храним только активные
+                    if bucket.is_full():
+                        self.chat_buckets.pop(chat_id, None)
+                self.condition.notify_all()
+            self.log_metrics()
+
+    def metrics(self) -> dict:
+        with self.condition:
+            latencies = sorted(self.latencies)
+            metrics = {"queue_depth": self.depth, "sent": self.sent, "failed": self.failed}
+        if len(latencies) >= 2:
+            percentiles = statistics.quantiles(latencies, n=100)
+            metrics.update(latency_p50=percentiles[49], latency_p95=percentiles[94])
+        return metrics
+
+    def log_metrics(self) -> None:
+        now = time.monotonic()
+        if now - self.logged < self.metrics_interval:
+            return
+        self.logged = now
+        logger.info("Outbox metrics: %s", self.metrics())
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Ожидает отправки всех сообщений из очереди, возвращает False, если не дождался за timeout секунд.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.depth == 0, timeout=timeout)
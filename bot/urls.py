@@ -5,4 +5,5 @@ from bot import views
 
 urlpatterns = [
     path("verify", views.BotVerificationView.as_view()),
+    path("webhook", views.BotWebhookView.as_view(), name="bot-webhook"),
 ]
\ No newline at end of file
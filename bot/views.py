@@ -1,11 +1,17 @@
-from rest_framework import permissions
+import hmac
+
+from django.conf import settings
+from rest_framework import permissions, status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from bot.models import TgUser
 from bot.serializers import TgUserSerializer
 from bot.tg.client import TgClient
+from bot.webhook import SECRET_HEADER, get_dispatcher
 
 
 class BotVerificationView(GenericAPIView):
@@ -28,3 +34,29 @@ class BotVerificationView(GenericAPIView):
 
         TgClient().get_send_message(tg_user_serialized.tg_chat_id, "Verification was successful")
         return Response(self.get_serializer(tg_user_serialized).data)
+
+
+class BotWebhookView(APIView):
+    """
+    Принимает обновления от Телеграма при BOT_DELIVERY_MODE = webhook. Запрос принимается только с секретом
+    BOT_WEBHOOK_SECRET в заголовке X-Telegram-Bot-Api-Secret-Token, который Телеграм получил при регистрации webhook.
+    Обновление ставится в очередь WebhookDispatcher и обрабатывается в фоне, Телеграм сразу получает ответ 200; при
+    переполненной очереди - 503, и Телеграм повторит доставку.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request: Request, *args, **kwargs):
+        if settings.BOT_DELIVERY_MODE != "webhook":
+            raise NotFound
+        secret = request.headers.get(SECRET_HEADER, "")
+        # без настроенного секрета webhook закрыт, сравнение за постоянное время не раскрывает секрет по времени ответа
+        if not settings.BOT_WEBHOOK_SECRET or \
+                not hmac.compare_digest(secret.encode(), settings.BOT_WEBHOOK_SECRET.encode()):
+            raise PermissionDenied
+        if not isinstance(request.data, dict) or "update_id" not in request.data:
+            raise ValidationError("Telegram update expected.")
+
+        if not get_dispatcher().submit(request.data):
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+        return Response()
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import threading
+from typing import Callable
+
+from django.conf import settings
+
+from bot.engine import BotEngine
+from bot.handlers import MessageHandler
+from bot.tg.client import TgClient
+from bot.tg.dc import Message
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_dispatcher: "WebhookDispatcher | None" = None
+_dispatcher_lock = threading.Lock()
+
+
+class WebhookDispatcher:
+    """
+    Передает обновления, доставленные Телеграмом на webhook, тем же обработчикам, что и runbot. Движок BotEngine
+    работает в цикле событий отдельного потока процесса, поэтому view только ставит обновление в очередь и сразу
+    отвечает Телеграму. Очередь ограничена queue_size обновлениями, которые приняты, но еще не обработаны: при
+    переполнении submit() возвращает False, и Телеграм повторит доставку позже. Как и при long polling, принятые, но
+    не обработанные обновления при остановке процесса теряются.
+    Телеграм доставляет обновления параллельно, поэтому сообщения одного чата могут попасть в разные процессы, и
+    порядок их обработки тогда не гарантирован. Состояние диалога при этом общее: ChatStateStore сверяет кэш процесса
+    с версией записи в БД при каждом чтении и отклоняет сохранение поверх параллельного изменения.
+    """
+
+    def __init__(self, handle: Callable[[Message], None], workers: int = 32, queue_size: int = 1000):
+        self.handle = handle
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.engine = BotEngine(self.handle_message, workers=workers)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="bot-webhook", daemon=True)
+
+    def start(self) -> "WebhookDispatcher":
+        self.thread.start()
+        return self
+
+    def submit(self, update: dict) -> bool:
+        if not self.slots.acquire(blocking=False):
+            logger.warning("Webhook queue is full, update %s rejected.", update.get("update_id"))
+            return False
+        self.loop.call_soon_threadsafe(self.dispatch, update)
+        return True
+
+    def dispatch(self, update: dict) -> None:
+        # обновления без сообщения и отброшенные движком сразу освобождают место в очереди
+        if not self.engine.dispatch(update):
+            self.slots.release()
+
+    def handle_message(self, message: Message) -> None:
+        try:
+            self.handle(message)
+        finally:
+            self.slots.release()
+
+    def join(self, timeout: float | None = None) -> None:
+        """
+        Ожидает обработки всех принятых обновлений.
+        """
+        # ожидание ставится в цикл событий после уже принятых обновлений, поэтому учитывает и их
+        asyncio.run_coroutine_threadsafe(self.engine.join(), self.loop).result(timeout)
+
+
+def get_dispatcher() -> WebhookDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            handler = MessageHandler.from_settings(TgClient())
+            _dispatcher = WebhookDispatcher(handler.handle_message, workers=settings.BOT_WORKERS,
+                                            queue_size=settings.BOT_WEBHOOK_QUEUE_SIZE).start()
+    return _dispatcher
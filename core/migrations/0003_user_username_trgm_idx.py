@@ -0,0 +1,20 @@
+# Generated by Django 4.0.1 on 2026-10-18 11:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_user_options'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # индекс по тому же выражению, которое Django строит для username__icontains в поиске админки
+        migrations.RunSQL(
+            sql='CREATE INDEX "user_username_trgm_idx" ON "core_user" USING gin ((UPPER("username"::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX IF EXISTS "user_username_trgm_idx";',
+        ),
+    ]
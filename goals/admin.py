@@ -1,14 +1,47 @@
 from django.contrib import admin
+from django.db.models import Exists, OuterRef, Q
+from django.utils.text import smart_split, unescape_string_literal
+
 from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
 
 
-class GoalCategoryAdmin(admin.ModelAdmin):
+class ParticipantSearchMixin:
+    """
+    Поиск в админке по полям search_fields и по username участников доски. Участники ищутся подзапросом EXISTS, а не
+    соединением с таблицей участников, поэтому строки в результатах не дублируются и DISTINCT не нужен. Для полей
+    поиска в БД созданы триграммные GIN-индексы по выражению UPPER(поле), которое Django использует в icontains.
+    В search_fields допускаются только поля модели и прямые внешние ключи. Полный подсчет строк в списке отключен.
+    """
+    participant_board_field = "board"
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+
+            participants = BoardParticipant.objects.filter(
+                board_id=OuterRef(self.participant_board_field), user__username__icontains=bit
+            )
+            condition = Q(Exists(participants))
+            for field_name in self.search_fields:
+                condition |= Q(**{f"{field_name}__icontains": bit})
+            queryset = queryset.filter(condition)
+
+        return queryset, False
+
+
+class GoalCategoryAdmin(ParticipantSearchMixin, admin.ModelAdmin):
     """
     Админка для категорий позволяет поиск по названию категории, username пользователя. Есть возможность фильтровать
     категории по статусу удалена/архивирована.
     """
     list_display = ("title", "user", "board", "created", "updated", "is_deleted")
-    search_fields = ("title", "user__username", "board__participants__user__username")
+    list_select_related = ("user", "board")
+    search_fields = ("title", "user__username")
     list_filter = ("is_deleted",)
     readonly_fields = ("created", "updated")
 
@@ -16,14 +49,15 @@ class GoalCategoryAdmin(admin.ModelAdmin):
 admin.site.register(GoalCategory, GoalCategoryAdmin)
 
 
-class GoalAdmin(admin.ModelAdmin):
+class GoalAdmin(ParticipantSearchMixin, admin.ModelAdmin):
     """
     Админка для целей позволяет поиск по названию и описанию цели, username пользователя. Есть возможность фильтровать
     цели по статусу, приоритету, дедлайну.
     """
     list_display = ("title", "user", "created", "updated", "description", "category",
                     "status", "priority", "due_date", "is_deleted")
-    search_fields = ("title", "description", "category__board__participants__user__username")
+    list_select_related = ("user", "category__user")
+    search_fields = ("title", "description")
     list_filter = ("status", "priority", "due_date", "is_deleted")
     readonly_fields = ("created", "updated")
     fieldsets = (
@@ -45,12 +79,13 @@ class GoalAdmin(admin.ModelAdmin):
 admin.site.register(Goal, GoalAdmin)
 
 
-class GoalCommentAdmin(admin.ModelAdmin):
+class GoalCommentAdmin(ParticipantSearchMixin, admin.ModelAdmin):
     """
     Админка для комментариев позволяет поиск по тексту комментария к цели, username пользователя, названию цели.
     """
     list_display = ("text", "goal", "user", "created", "updated")
-    search_fields = ("text", "goal__category__board__participants__user__username", "goal__title")
+    list_select_related = ("user", "goal__user")
+    search_fields = ("text", "goal__title")
     readonly_fields = ("created", "updated")
     fieldsets = (
         (None, {
@@ -62,13 +97,14 @@ class GoalCommentAdmin(admin.ModelAdmin):
 admin.site.register(GoalComment, GoalCommentAdmin)
 
 
-class BoardAdmin(admin.ModelAdmin):
+class BoardAdmin(ParticipantSearchMixin, admin.ModelAdmin):
     """
     Админка для досок позволяет поиск по названию доски и username пользователя. Есть возможность фильтровать доски по
     статусу удалена/архивирована.
     """
     list_display = ("title", "created", "updated", "is_deleted")
-    search_fields = ("title", "participants__user__username")
+    participant_board_field = "pk"
+    search_fields = ("title",)
     list_filter = ("is_deleted",)
     readonly_fields = ("created", "updated")
 
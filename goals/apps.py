@@ -5,3 +5,6 @@ class GoalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'goals'
     verbose_name = 'Цели'
+
+    def ready(self):
+        import goals.signals  # noqa: F401
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+READ_METHODS = ["get", "head", "options"]
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_VIEWS_THREADS,
+                                           thread_name_prefix="async-views")
+    return _executor
+
+
+class AsyncViewMixin:
+    """
+    Подмешивается к view DRF только для чтения и превращает его в асинхронный view для запуска под ASGI-сервером.
+    В Django 4.0 нет асинхронного ORM, а DRF выполняет запрос синхронно, поэтому view целиком (аутентификация, права,
+    запросы к БД, сериализация) выполняется одним вызовом в общем пуле из ASYNC_VIEWS_THREADS потоков. Цикл событий
+    при этом не блокируется: медленный запрос занимает один поток пула, а остальные запросы ждут свободный поток в цикле
+    событий, не занимая ни потоков, ни соединений с БД. Число одновременных запросов к БД от процесса ограничено
+    размером пула, а не числом открытых клиентских соединений. Соединения потоков пула закрываются (или сохраняются
+    по CONN_MAX_AGE) после каждого запроса. При ASYNC_VIEWS_THREADS = 0 view выполняется в потоке запроса, как
+    синхронные view Django под ASGI.
+    """
+    http_method_names = READ_METHODS
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        def run_in_pool(request, *args, **kwargs):
+            # сигналы начала и конца запроса выполняются в другом потоке и не закрывают соединения потоков пула
+            close_old_connections()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                close_old_connections()
+
+        async def async_view(request, *args, **kwargs):
+            if settings.ASYNC_VIEWS_THREADS:
+                call = sync_to_async(run_in_pool, thread_sensitive=False, executor=get_executor())
+            else:
+                call = sync_to_async(view)
+            return await call(request, *args, **kwargs)
+
+        async_view.cls = view.cls
+        async_view.initkwargs = view.initkwargs
+        async_view.csrf_exempt = True
+        return async_view
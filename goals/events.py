@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import re
+import select
+import threading
+import time
+from importlib import import_module
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, connection, connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.utils.module_loading import import_string
+
+from goals.permissions import load_board_roles
+
+logger = logging.getLogger(__name__)
+
+BOARD_EVENTS_PATH = re.compile(r"^/goals/board/(?P<pk>\d+)/events$")
+
+
+class Subscription:
+    """
+    Подписка одного SSE-клиента на события доски. События складываются в ограниченную очередь asyncio; если клиент не
+    успевает их читать, очередь очищается и клиенту отправляется событие resync: загрузить доску заново.
+    """
+    queue_size = 100
+
+    def __init__(self, board_id: int):
+        self.board_id = board_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+    def put(self, event: dict) -> None:
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = resync_event(self.board_id)
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+def resync_event(board_id: int) -> dict:
+    return {"board_id": board_id, "entity": "board", "object_id": board_id, "action": "resync"}
+
+
+class InProcessBroker:
+    """
+    Брокер событий досок внутри одного процесса: события, опубликованные после фиксации транзакции, сразу раздаются
+    подписчикам этого же процесса. Подходит, когда изменения и SSE-соединения обслуживает один процесс ASGI; для
+    нескольких процессов используется PostgresBroker.
+    """
+    # при массовых изменениях (импорт, архивация) вместо сотен событий клиент получает одно событие resync
+    max_events_per_board = 50
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.subscriptions: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, board_id: int) -> Subscription:
+        subscription = Subscription(board_id)
+        with self.lock:
+            self.subscriptions.setdefault(board_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.board_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.board_id, None)
+
+    def publish(self, events: list[dict]) -> None:
+        self.dispatch(events)
+
+    def dispatch(self, events: list[dict]) -> None:
+        by_board: dict[int, list[dict]] = {}
+        for event in events:
+            by_board.setdefault(event["board_id"], []).append(event)
+
+        with self.lock:
+            targets = [(subscription, board_events) for board_id, board_events in by_board.items()
+                       for subscription in self.subscriptions.get(board_id, ())]
+        for subscription, board_events in targets:
+            if len(board_events) > self.max_events_per_board:
+                board_events = [resync_event(subscription.board_id)]
+            for event in board_events:
+                # publish вызывается из синхронного кода в другом потоке, поэтому очередь пополняется через цикл событий
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Брокер событий через PostgreSQL LISTEN/NOTIFY: процесс, изменивший доску, отправляет события командой pg_notify,
+    а каждый процесс с SSE-подписчиками слушает канал в отдельном потоке на собственном соединении и раздает события
+    своим подписчикам. Позволяет отдавать события из процессов ASGI, даже если изменения выполнены в процессах WSGI
+    или в фоновых командах.
+    """
+    channel = "board_events"
+    # размер уведомления в PostgreSQL ограничен 8000 байт, поэтому события отправляются пачками
+    max_payload = 7000
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.listener: threading.Thread | None = None
+
+    def subscribe(self, board_id: int) -> Subscription:
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name="board-events-listener", daemon=True)
+                self.listener.start()
+        return super().subscribe(board_id)
+
+    def publish(self, events: list[dict]) -> None:
+        payloads: list[str] = []
+        batch: list[str] = []
+        size = 0
+        for event in map(json.dumps, events):
+            if batch and size + len(event) + 1 > self.max_payload:
+                payloads.append(f"[{','.join(batch)}]")
+                batch, size = [], 0
+            batch.append(event)
+            size += len(event) + 1
+        if batch:
+            payloads.append(f"[{','.join(batch)}]")
+
+        with connection.cursor() as cursor:
+            for payload in payloads:
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def listen(self) -> None:
+        while True:
+            try:
+                db = psycopg2.connect(**connections["default"].get_connection_params())
+                db.autocommit = True
+                with db.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                logger.info("Listening for board events on channel %s.", self.channel)
+
+                while True:
+                    if select.select([db], [], [], 5.0) == ([], [], []):
+                        continue
+                    db.poll()
+                    while db.notifies:
+                        self.dispatch(json.loads(db.notifies.pop(0).payload))
+            except psycopg2.Error:
+                logger.exception("Board events listener lost the database connection, reconnecting.")
+                time.sleep(1)
+
+
+_broker: InProcessBroker | None = None
+
+
+def get_broker() -> InProcessBroker:
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.BOARD_EVENTS_BROKER)()
+    return _broker
+
+
+@sync_to_async
+def is_board_participant(scope: dict, board_id: int) -> bool:
+    """
+    Проверяет по cookie сессии, что пользователь вошел в систему и участвует в доске.
+    """
+    try:
+        headers = dict(scope["headers"])
+        cookies = parse_cookie(headers.get(b"cookie", b"").decode("latin-1"))
+        session = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+        request = HttpRequest()
+        request.session = session
+        user = get_user(request)
+        return user.is_authenticated and board_id in load_board_roles(user.pk)
+    finally:
+        close_old_connections()
+
+
+async def send_response(send, status: int, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def wait_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def board_events(scope: dict, receive, send, board_id: int) -> None:
+    """
+    ASGI-обработчик потока Server-Sent Events для доски: после проверки доступа держит соединение открытым и
+    отправляет клиенту события изменений целей, категорий, комментариев и участников доски (event - сущность, data -
+    JSON с board_id, entity, object_id и action). Раз в BOARD_EVENTS_HEARTBEAT секунд отправляется комментарий,
+    чтобы прокси не закрывали простаивающее соединение. После переподключения клиент получает пропущенные изменения
+    через goals/changes.
+    """
+    if scope["method"] != "GET":
+        await send_response(send, 405, b"Method not allowed")
+        return
+    if not await is_board_participant(scope, board_id):
+        await send_response(send, 404, b"Not found")
+        return
+
+    broker = get_broker()
+    subscription = broker.subscribe(board_id)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+
+        while True:
+            event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({event, disconnect}, timeout=settings.BOARD_EVENTS_HEARTBEAT,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                event.cancel()
+                break
+            if event in done:
+                data = event.result()
+                message = f"event: {data['entity']}\ndata: {json.dumps(data)}\n\n"
+            else:
+                event.cancel()
+                message = ": ping\n\n"
+            await send({"type": "http.response.body", "body": message.encode("utf-8"), "more_body": True})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(subscription)
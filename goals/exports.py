@@ -0,0 +1,70 @@
+import csv
+import json
+from typing import Iterator
+
+from django.db.models import QuerySet
+
+from goals.models import GoalCategory, GoalComment
+from goals.serializers import goal_category_values_serializer, goal_comment_values_serializer, \
+    goal_values_serializer
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_COLUMNS = ["id", "title", "description", "status", "priority", "due_date", "board", "category",
+               "category_title", "user", "created", "updated", "is_deleted"]
+
+
+def attach_comments(goals: list[dict]) -> None:
+    comments: dict[int, list[dict]] = {goal["id"]: [] for goal in goals}
+    queryset = GoalComment.objects.filter(goal_id__in=comments).order_by("goal_id", "created")
+    for comment in goal_comment_values_serializer.serialize(goal_comment_values_serializer.values(queryset)):
+        comments[comment["goal"]].append(comment)
+    for goal in goals:
+        goal["comments"] = comments[goal["id"]]
+
+
+def export_ndjson(goals: QuerySet, categories: QuerySet, with_comments: bool) -> Iterator[str]:
+    """
+    Выгрузка в формате NDJSON: по одной записи JSON в строке, сначала категории ({"type": "category", ...}), затем
+    цели ({"type": "goal", ...}), с комментариями в поле comments, если они запрошены.
+    """
+    for chunk in goal_category_values_serializer.stream(categories.order_by("id"), EXPORT_CHUNK_SIZE):
+        yield "".join(json.dumps({"type": "category", **item}, ensure_ascii=False) + "\n" for item in chunk)
+
+    for chunk in goal_values_serializer.stream(goals.order_by("id"), EXPORT_CHUNK_SIZE):
+        if with_comments:
+            attach_comments(chunk)
+        yield "".join(json.dumps({"type": "goal", **item}, ensure_ascii=False) + "\n" for item in chunk)
+
+
+class Echo:
+    """
+    Псевдобуфер для csv.writer: вместо записи возвращает строку, чтобы ее можно было сразу отдать клиенту.
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_csv(goals: QuerySet, with_comments: bool) -> Iterator[str]:
+    """
+    Выгрузка целей в формате CSV: одна строка на цель, вместо вложенного пользователя выводится его username, к
+    категории добавляется ее название. Комментарии, если они запрошены, выводятся в колонке comments списком JSON.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS + ["comments"] if with_comments else CSV_COLUMNS)
+
+    for chunk in goal_values_serializer.stream(goals.order_by("id"), EXPORT_CHUNK_SIZE):
+        if with_comments:
+            attach_comments(chunk)
+        titles = dict(GoalCategory.objects.filter(
+            pk__in={goal["category"] for goal in chunk if goal["category"]}
+        ).values_list("id", "title"))
+
+        rows = []
+        for goal in chunk:
+            row = {**goal, "user": goal["user"]["username"], "category_title": titles.get(goal["category"])}
+            values = [row[column] for column in CSV_COLUMNS]
+            if with_comments:
+                values.append(json.dumps(goal["comments"], ensure_ascii=False))
+            rows.append(writer.writerow(values))
+        yield "".join(rows)
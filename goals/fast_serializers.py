@@ -0,0 +1,126 @@
+from operator import itemgetter
+from typing import Any, Callable, Iterator, cast
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import fields, relations, serializers
+from rest_framework.response import Response
+
+# Поля, значение которых из .values() совпадает с результатом to_representation и не требует преобразования.
+PLAIN_FIELDS = (fields.IntegerField, fields.CharField, fields.BooleanField, relations.PrimaryKeyRelatedField)
+
+# Функция, которая получает значение поля ответа из строки .values(), вместе с именем поля.
+Getter = tuple[str, Callable[[dict], Any]]
+
+
+class ValuesSerializer:
+    """
+    Быстрый режим вывода списков только для чтения. По полям ModelSerializer один раз составляется список полей для
+    .values() и функции преобразования строки в словарь ответа, поэтому для каждой строки не создаются объекты моделей
+    и экземпляры вложенных сериализаторов. Результат совпадает по форме с выводом исходного сериализатора: тот же
+    порядок ключей, вложенные сериализаторы ForeignKey выводятся словарями, даты - через to_representation полей DRF.
+    Поля, которые нельзя получить из .values() (SerializerMethodField, вложенные списки), заполняются функциями из
+    batch_fields, которые получают все элементы страницы сразу и загружают данные одним запросом.
+    """
+
+    def __init__(self, serializer_class: type[serializers.ModelSerializer],
+                 batch_fields: dict[str, Callable[[list[dict]], None]] | None = None):
+        self.serializer_class = serializer_class
+        self.batch_fields = batch_fields or {}
+        self.lookups: list[str] = []
+        self.getters: list[Getter] | None = None
+
+    def compile(self) -> list[Getter]:
+        if self.getters is None:
+            lookups: list[str] = []
+            getters = self.compile_serializer(self.serializer_class(), "", lookups, batch_fields=self.batch_fields)
+            self.lookups, self.getters = lookups, getters
+        return self.getters
+
+    def compile_serializer(self, serializer: serializers.Serializer, prefix: str, lookups: list[str],
+                           batch_fields: dict | None = None) -> list[Getter]:
+        getters: list[Getter] = []
+        for field in serializer._readable_fields:
+            # у полей, привязанных к сериализатору, field_name всегда задан
+            name = cast(str, field.field_name)
+            if batch_fields is not None and name in batch_fields:
+                getters.append((name, lambda row: None))
+                continue
+            if field.source == "*":
+                raise ImproperlyConfigured(f"Field {name} cannot be read from values().")
+
+            key = prefix + "__".join(field.source_attrs)
+            if isinstance(field, serializers.Serializer):
+                # вложенный сериализатор внешнего ключа: пустой ключ выводится как None
+                lookups.append(key)
+                nested = self.compile_serializer(field, f"{key}__", lookups)
+                getters.append((name, self.nested_getter(key, nested)))
+            elif isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                    relations.ManyRelatedField)):
+                raise ImproperlyConfigured(f"Field {name} requires a batch loader.")
+            else:
+                lookups.append(key)
+                getters.append((name, self.field_getter(key, field)))
+        return getters
+
+    @staticmethod
+    def field_getter(key: str, field: fields.Field) -> Callable:
+        if isinstance(field, PLAIN_FIELDS):
+            return itemgetter(key)
+
+        to_representation = field.to_representation
+
+        def getter(row: dict):
+            value = row[key]
+            return None if value is None else to_representation(value)
+        return getter
+
+    @staticmethod
+    def nested_getter(key: str, getters: list[Getter]) -> Callable:
+        def getter(row: dict):
+            if row[key] is None:
+                return None
+            return {name: get(row) for name, get in getters}
+        return getter
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        self.compile()
+        # предзагрузка связей не работает для строк .values(), данные для таких полей загружают batch_fields
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def serialize(self, rows) -> list[dict]:
+        getters = self.compile()
+        items = [{name: get(row) for name, get in getters} for row in rows]
+        for load in self.batch_fields.values():
+            load(items)
+        return items
+
+    def stream(self, queryset: QuerySet, chunk_size: int = 2000) -> Iterator[list[dict]]:
+        """
+        Выводит queryset порциями по chunk_size элементов. Строки читаются серверным курсором через iterator(), поэтому
+        в памяти одновременно находится только одна порция, а функции batch_fields выполняются один раз на порцию.
+        """
+        chunk: list[dict] = []
+        for row in self.values(queryset).iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield self.serialize(chunk)
+                chunk = []
+        if chunk:
+            yield self.serialize(chunk)
+
+
+class ValuesListMixin:
+    """
+    Подмешивается к ListAPIView и выводит список через ValuesSerializer из атрибута values_serializer вместо
+    serializer_class. Фильтрация, сортировка и пагинация работают как обычно, но над строками .values().
+    """
+    values_serializer: ValuesSerializer
+
+    def list(self, request, *args, **kwargs):
+        rows = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.serialize(page))
+        return Response(self.values_serializer.serialize(rows))
@@ -1,8 +1,12 @@
+import re
+
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db import models
 from django_filters import rest_framework
+from rest_framework import filters
 
-from goals.models import Goal
+from goals.models import BoardProgressSnapshot, Goal, GOAL_SEARCH_CONFIG, goal_search_vector
 
 
 class GoalDateFilter(rest_framework.FilterSet):
@@ -11,7 +15,7 @@ class GoalDateFilter(rest_framework.FilterSet):
     """
     class Meta:
         model = Goal
-        fields = {
+        fields: dict[str, tuple[str, ...]] = {
             "due_date": ("lte", "gte"),
             "category": ("exact", "in"),
             "status": ("exact", "in"),
@@ -23,4 +27,43 @@ class GoalDateFilter(rest_framework.FilterSet):
     }
 
 
+class GoalExportFilter(GoalDateFilter):
+    """
+    Фильтрация целей для выгрузки: к фильтрам GoalDateFilter добавлен фильтр по доске.
+    """
+    class Meta(GoalDateFilter.Meta):
+        fields = {**GoalDateFilter.Meta.fields, "board": ("exact",)}
+
+
+class BoardProgressFilter(rest_framework.FilterSet):
+    """
+    Осуществляет фильтрацию снимков прогресса доски по начальной и конечной датам и по статусу цели.
+    """
+    class Meta:
+        model = BoardProgressSnapshot
+        fields = {
+            "date": ("lte", "gte"),
+            "status": ("exact", "in"),
+        }
+
+
+class GoalSearchFilter(filters.SearchFilter):
+    """
+    Полнотекстовый поиск по названию и описанию цели через параметр ?search=. Вместо ILIKE '%term%' запрос строится
+    по выражению to_tsvector, для которого в БД есть GIN-индекс. Каждое слово запроса ищется по префиксу, все слова
+    должны встретиться в цели. Если в запросе не передан параметр сортировки, результаты упорядочиваются по
+    релевантности.
+    """
+    def filter_queryset(self, request, queryset, view):
+        words = [word for term in self.get_search_terms(request) for word in re.findall(r"\w+", term)]
+        if not words:
+            return queryset
+
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=GOAL_SEARCH_CONFIG)
+        queryset = queryset.annotate(
+            search=goal_search_vector(), search_rank=SearchRank(goal_search_vector(), query)
+        ).filter(search=query)
 
+        if not request.query_params.get(filters.OrderingFilter.ordering_param):
+            queryset = queryset.order_by("-search_rank", *queryset.query.order_by)
+        return queryset
@@ -0,0 +1,147 @@
+import csv
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterator
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.models import User
+from goals.models import Board, Goal, GoalCategory, GoalCounter
+from goals.signals import BoardChange, board_changed
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+class GoalImportRowSerializer(serializers.Serializer):
+    """
+    Сериализатор одной строки импорта целей. Категория передается названием (поле category_title или category) и
+    создается при первом упоминании. В отличие от GoalCreateSerializer дедлайн в прошлом допускается: при переносе
+    из другого трекера у целей бывают просроченные сроки.
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(max_length=1000, required=False, allow_blank=True, allow_null=True)
+    status = serializers.ChoiceField(choices=Goal.Status.choices, required=False, default=Goal.Status.to_do)
+    priority = serializers.ChoiceField(choices=Goal.Priority.choices, required=False, default=Goal.Priority.medium)
+    due_date = serializers.DateTimeField(required=False, allow_null=True)
+    category = serializers.CharField(max_length=255)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            # пустые ячейки CSV считаются отсутствующими значениями
+            data = {key: value for key, value in data.items() if value not in ("", None)}
+            if "category_title" in data:
+                data["category"] = data["category_title"]
+        return super().to_internal_value(data)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    categories_created: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+
+def read_rows(stream: IO[str], input_format: str) -> Iterator[Any]:
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # некорректная строка не прерывает импорт: сериализатор строки отклонит ее как значение, не являющееся
+            # объектом
+            yield line
+
+
+class GoalImporter:
+    """
+    Массовый импорт целей в доску из CSV или NDJSON (CSV выгрузки goal/export также подходит). Строки читаются и
+    проверяются порциями по batch_size, категории ищутся и создаются один раз на каждое новое название, цели
+    сохраняются одним bulk_create на порцию в отдельной транзакции. Ошибки возвращаются с номером строки (первая
+    строка данных имеет номер 1), корректные строки загружаются. Если файл не удается декодировать как UTF-8 или
+    разобрать как CSV, импорт останавливается с ошибкой на строке, где прервалось чтение. Счетчики целей и версия доски
+    обновляются один раз на порцию.
+    """
+    max_errors = 1000
+
+    def __init__(self, board: Board, user: User, batch_size: int = 5000):
+        self.board = board
+        self.user = user
+        self.batch_size = batch_size
+        self.categories: dict[str, int] = {}
+        self.result = ImportResult()
+
+    def run(self, stream: IO[str], input_format: str) -> ImportResult:
+        self.categories = dict(
+            GoalCategory.objects.filter(board=self.board, is_deleted=False).order_by("-id").values_list("title", "id")
+        )
+
+        batch = []
+        number = 0
+        try:
+            for number, row in enumerate(read_rows(stream, input_format), start=1):
+                batch.append((number, row))
+                if len(batch) == self.batch_size:
+                    self.load_batch(batch)
+                    batch = []
+        except (UnicodeDecodeError, csv.Error) as error:
+            # файл в другой кодировке или с поврежденной разметкой CSV дальше не читается: ошибка относится к
+            # строке, на которой остановилось чтение, а уже прочитанные строки загружаются
+            self.add_error(number + 1, {"non_field_errors": [f"The file could not be read: {error}."]})
+        if batch:
+            self.load_batch(batch)
+        return self.result
+
+    def add_error(self, number: int, errors) -> None:
+        if len(self.result.errors) < self.max_errors:
+            self.result.errors.append({"row": number, "errors": errors})
+
+    def load_batch(self, batch: list[tuple[int, Any]]) -> None:
+        rows = []
+        for number, row in batch:
+            serializer = GoalImportRowSerializer(data=row)
+            if serializer.is_valid():
+                rows.append(serializer.validated_data)
+            else:
+                self.add_error(number, serializer.errors)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self.create_categories({row["category"] for row in rows} - self.categories.keys())
+
+            now = timezone.now()
+            goals = Goal.objects.bulk_create([
+                Goal(board=self.board, category_id=self.categories[row["category"]], user=self.user,
+                     title=row["title"], description=row.get("description"), status=row["status"],
+                     priority=row["priority"], due_date=row.get("due_date"), created=now, updated=now)
+                for row in rows
+            ], batch_size=self.batch_size)
+
+            # bulk_create не вызывает Goal.save() и сигналы модели, поэтому счетчики и версия доски обновляются здесь
+            GoalCounter.apply(Counter((goal.board_id, goal.category_id, goal.status, goal.priority) for goal in goals))
+            board_changed.send(sender=Goal, changes=[
+                BoardChange(self.board.pk, "goal", goal.pk, BoardChange.CREATED) for goal in goals
+            ])
+        self.result.created += len(goals)
+
+    def create_categories(self, titles: set[str]) -> None:
+        if not titles:
+            return
+        now = timezone.now()
+        categories = GoalCategory.objects.bulk_create([
+            GoalCategory(board=self.board, user=self.user, title=title, created=now, updated=now)
+            for title in sorted(titles)
+        ])
+        self.categories.update((category.title, category.pk) for category in categories)
+        self.result.categories_created += len(categories)
+        board_changed.send(sender=GoalCategory, changes=[
+            BoardChange(self.board.pk, "category", category.pk, BoardChange.CREATED) for category in categories
+        ])
@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
+from goals.serializers import GoalCategorySerializer, GoalCommentSerializer, GoalSerializer, \
+    goal_category_values_serializer, goal_comment_values_serializer, goal_values_serializer
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время вывода списков целей, категорий и комментариев через ModelSerializer и через быстрый режим
+    ValuesSerializer на 50, 500 и 5000 строк (по умолчанию). Тестовые данные создаются во временной транзакции,
+    которая откатывается после замеров. Перед замерами проверяется, что оба способа дают одинаковый результат.
+    """
+    help = "Benchmarks ModelSerializer against the values-based list serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="Row counts to benchmark.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the best one is reported.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench_user_{time.time_ns()}")
+            board = Board.objects.create(title="bench_board")
+            BoardParticipant.objects.create(board=board, user=user)
+            for size in options["sizes"]:
+                self.fill(board, user, size)
+                for title, queryset, serializer_class, values_serializer in self.get_cases(board):
+                    queryset = queryset[:size]
+                    model_data = serializer_class(queryset, many=True).data
+                    values_data = values_serializer.serialize(values_serializer.values(queryset))
+                    if [dict(item) for item in model_data] != values_data:
+                        raise CommandError(f"Values serializer output differs for {title}.")
+
+                    # запрос к БД входит в оба замера: .all() каждый раз создает новый, не вычисленный queryset
+                    model_time = self.measure(
+                        lambda: serializer_class(queryset.all(), many=True).data, options["repeat"]
+                    )
+                    values_time = self.measure(
+                        lambda: values_serializer.serialize(values_serializer.values(queryset)), options["repeat"]
+                    )
+                    self.stdout.write(
+                        f"{title:<10} {size:>6} rows: ModelSerializer {model_time * 1000:8.1f} ms, "
+                        f"values {values_time * 1000:8.1f} ms, x{model_time / values_time:.1f}"
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def fill(board: Board, user: User, size: int) -> None:
+        now = timezone.now()
+        missing = size - GoalCategory.objects.filter(board=board).count()
+        GoalCategory.objects.bulk_create([
+            GoalCategory(board=board, user=user, title=f"bench_category_{index}", created=now, updated=now)
+            for index in range(max(missing, 0))
+        ])
+        category = GoalCategory.objects.filter(board=board).first()
+
+        missing = size - Goal.objects.filter(board=board).count()
+        goals = Goal.objects.bulk_create([
+            Goal(board=board, category=category, user=user, title=f"bench_goal_{index}", due_date=now,
+                 created=now, updated=now)
+            for index in range(max(missing, 0))
+        ])
+        GoalComment.objects.bulk_create([
+            GoalComment(board=board, goal=goal, user=user, text=f"bench_comment_{goal.pk}", created=now, updated=now)
+            for goal in goals
+        ])
+
+    @staticmethod
+    def get_cases(board: Board) -> list[tuple]:
+        return [
+            ("goals", Goal.objects.filter(board=board).select_related("user").order_by("id"),
+             GoalSerializer, goal_values_serializer),
+            ("categories", GoalCategory.objects.filter(board=board).select_related("user").prefetch_related(
+                "goal_counters").order_by("id"), GoalCategorySerializer, goal_category_values_serializer),
+            ("comments", GoalComment.objects.filter(board=board).select_related("user").order_by("id"),
+             GoalCommentSerializer, goal_comment_values_serializer),
+        ]
+
+    @staticmethod
+    def measure(func, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
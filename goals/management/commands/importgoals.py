@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from goals.importers import GoalImporter, IMPORT_FORMATS
+from goals.models import Board
+
+
+class Command(BaseCommand):
+    """
+    Загружает цели в доску из файла CSV или NDJSON через GoalImporter (см. goals/importers.py). Автором целей и
+    создаваемых категорий становится пользователь из параметра --user. Выводит число созданных целей и категорий,
+    скорость загрузки и ошибки по номерам строк.
+    """
+    help = "Imports goals into a board from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("board", type=int, help="Board id.")
+        parser.add_argument("path", help="Path to the CSV or NDJSON file.")
+        parser.add_argument("--user", required=True, help="Username of the goals' author.")
+        parser.add_argument("--input", choices=IMPORT_FORMATS, help="File format, defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows validated and saved per transaction.")
+
+    def handle(self, *args, **options):
+        board = Board.objects.filter(pk=options["board"], is_deleted=False).first()
+        if board is None:
+            raise CommandError(f"Board {options['board']} does not exist.")
+        user = User.objects.filter(username=options["user"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} does not exist.")
+        input_format = options["input"] or options["path"].rsplit(".", 1)[-1].lower()
+        if input_format not in IMPORT_FORMATS:
+            raise CommandError(f"Supported formats: {', '.join(IMPORT_FORMATS)}.")
+
+        started = time.perf_counter()
+        with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+            result = GoalImporter(board, user, batch_size=options["batch_size"]).run(stream, input_format)
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            f"Created {result.created} goals and {result.categories_created} categories in {elapsed:.1f} s "
+            f"({result.created / max(elapsed, 1e-9) * 60:.0f} goals per minute)."
+        )
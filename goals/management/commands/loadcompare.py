@@ -0,0 +1,83 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+
+READ_PATHS = ["goal/list", "goal_category/list", "goal_comment/list", "board/list"]
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает синхронные view под gunicorn и асинхронные view (goals/async/...) под uvicorn при одновременной
+    нагрузке: для каждого пути отправляет --requests запросов из --concurrency (по умолчанию 200) параллельных
+    клиентов сначала на синхронный, затем на асинхронный адрес и выводит пропускную способность, долю ошибок и
+    перцентили задержки. Запросы выполняются от имени --user через созданную для него сессию.
+
+    Пример: python manage.py loadcompare --user admin --sync-url http://127.0.0.1:8000/goals/
+    --async-url http://127.0.0.1:8001/goals/async/
+    """
+    help = "Compares sync and async read endpoints under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username to send the requests as.")
+        parser.add_argument("--sync-url", default="http://127.0.0.1:8000/goals/", help="Base URL of sync views.")
+        parser.add_argument("--async-url", default="http://127.0.0.1:8001/goals/async/",
+                            help="Base URL of async views.")
+        parser.add_argument("--paths", nargs="+", default=READ_PATHS, help="Endpoints to compare.")
+        parser.add_argument("--concurrency", type=int, default=200, help="Concurrent clients.")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint.")
+        parser.add_argument("--timeout", type=float, default=30, help="Request timeout in seconds.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["user"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} does not exist.")
+        cookies = {settings.SESSION_COOKIE_NAME: self.create_session(user)}
+
+        for path in options["paths"]:
+            for mode in ("sync", "async"):
+                url = options[f"{mode}_url"].rstrip("/") + "/" + path
+                self.stdout.write(f"{path:<20} {mode:<5} " + self.run(url, cookies, options))
+
+    @staticmethod
+    def create_session(user: User) -> str:
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session.session_key
+
+    @staticmethod
+    def run(url: str, cookies: dict, options: dict) -> str:
+        local = threading.local()
+
+        def fetch(_) -> tuple[float, bool]:
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                local.session.cookies.update(cookies)
+            started = time.perf_counter()
+            try:
+                ok = local.session.get(url, timeout=options["timeout"]).status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        percentiles = statistics.quantiles(latencies, n=100)
+        errors = sum(not ok for _, ok in results)
+        return (f"{len(results) / elapsed:8.1f} req/s, errors {errors:>5}, p50 {percentiles[49]:8.1f} ms, "
+                f"p95 {percentiles[94]:8.1f} ms, p99 {percentiles[98]:8.1f} ms")
@@ -0,0 +1,42 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from goals.models import ChangeLog, ChangeLogPrune
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Удаляет записи журнала изменений ChangeLog старше --days дней (по умолчанию CHANGELOG_RETENTION_DAYS) порциями
+    по --batch-size записей. Вместе с каждой порцией в той же транзакции сохраняется ChangeLogPrune с наибольшим
+    номером удаленной транзакции, поэтому клиент с более старым курсором получит full_sync_required, а не неполный
+    список изменений. Команду нужно запускать регулярно (cron, планировщик контейнеров).
+    """
+    help = "Deletes change log entries older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CHANGELOG_RETENTION_DAYS,
+                            help="Days to keep change log entries.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Entries deleted per transaction.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        total = 0
+        while True:
+            with transaction.atomic():
+                batch = list(ChangeLog.objects.filter(created__lt=cutoff).order_by("created").values_list(
+                    "pk", "txid"
+                )[:options["batch_size"]])
+                if not batch:
+                    break
+                ChangeLogPrune.objects.create(txid=max(txid for _, txid in batch), deleted=len(batch))
+                ChangeLog.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+            total += len(batch)
+
+        logger.info("Change log pruned before %s: %s entries deleted.", cutoff, total)
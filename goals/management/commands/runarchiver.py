@@ -0,0 +1,74 @@
+import logging
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from goals.models import ArchiveTask, CounterKey, Goal, GoalCounter
+from goals.signals import BoardChange, board_changed
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Фоновый обработчик задач ArchiveTask: переводит цели удаленных досок и категорий в статус «Архив» порциями по
+    batch_size целей. Каждая порция выполняется в отдельной короткой транзакции, задача блокируется через
+    SELECT ... FOR UPDATE SKIP LOCKED, поэтому можно запускать несколько обработчиков одновременно, а после перезапуска
+    обработка продолжается с последней сохраненной цели. С флагом --once команда завершается, когда задач не осталось.
+    """
+    help = "Archives goals of deleted boards and categories in background batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Goals archived per transaction.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit when there are no pending tasks.")
+
+    def handle(self, *args, **options):
+        while True:
+            if self.process_batch(options["batch_size"]):
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
+
+    def process_batch(self, batch_size: int) -> bool:
+        with transaction.atomic():
+            task = ArchiveTask.objects.select_for_update(skip_locked=True).filter(
+                status__in=[ArchiveTask.Status.pending, ArchiveTask.Status.in_progress]
+            ).order_by("id").first()
+            if task is None:
+                return False
+
+            goals = task.get_goals().exclude(status=Goal.Status.archived).filter(id__gt=task.last_goal_id)
+            if task.status == ArchiveTask.Status.pending:
+                task.status = ArchiveTask.Status.in_progress
+                task.total = goals.count()
+                logger.info("Archive task %s started: %s goals to archive.", task.pk, task.total)
+
+            goal_ids = list(goals.select_for_update().order_by("id").values_list("id", flat=True)[:batch_size])
+            if goal_ids:
+                # счетчики целей переносятся в статус «Архив» одной сводкой на всю порцию
+                counters: Counter[CounterKey] = Counter()
+                for board_id, category_id, status, priority, count in Goal.objects.filter(pk__in=goal_ids).values(
+                    "board_id", "category_id", "status", "priority"
+                ).annotate(count=Count("id")).values_list("board_id", "category_id", "status", "priority", "count"):
+                    counters[board_id, category_id, status, priority] -= count
+                    counters[board_id, category_id, Goal.Status.archived, priority] += count
+
+                Goal.objects.filter(pk__in=goal_ids).update(status=Goal.Status.archived, updated=timezone.now())
+                GoalCounter.apply(counters)
+                task.processed += len(goal_ids)
+                task.last_goal_id = goal_ids[-1]
+                board_changed.send(sender=Goal, changes=[
+                    BoardChange(task.board_id, "goal", goal_id, BoardChange.UPDATED) for goal_id in goal_ids
+                ])
+
+            if len(goal_ids) < batch_size:
+                task.status = ArchiveTask.Status.done
+                logger.info("Archive task %s finished: %s goals archived.", task.pk, task.processed)
+            task.save()
+        return True
@@ -0,0 +1,55 @@
+import logging
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from goals.models import BoardProgressSnapshot, GoalCounter
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Записывает снимок прогресса всех актуальных досок за день: одну строку BoardProgressSnapshot на доску и статус.
+    Количество целей берется одним сгруппированным запросом из итоговых счетчиков досок GoalCounter, то есть всегда
+    на момент запуска. Поэтому снимок записывается только за сегодня (повторный запуск перезаписывает его) или за
+    вчера, если снимка за вчера еще нет: так запуск сразу после полуночи сохраняет итог закончившегося дня. Уже
+    записанные снимки прошлых дней не перезаписываются. Команду нужно запускать раз в сутки (cron, планировщик
+    контейнеров).
+    """
+    help = "Records today's goal count per board and status for burndown charts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Snapshot date in YYYY-MM-DD format, defaults to today. Yesterday is "
+                                           "accepted only if it has no snapshot yet, so that a run started just "
+                                           "after midnight can record the day that has ended. Counts are always "
+                                           "taken as of now, so older dates and stored past snapshots are rejected.")
+
+    def handle(self, *args, **options):
+        try:
+            snapshot_date = date.fromisoformat(options["date"]) if options["date"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("Date must be in YYYY-MM-DD format.")
+
+        today = timezone.localdate()
+        if snapshot_date not in (today, today - timedelta(days=1)):
+            raise CommandError("Only today's or yesterday's snapshot can be recorded.")
+        if snapshot_date != today and BoardProgressSnapshot.objects.filter(date=snapshot_date).exists():
+            raise CommandError(f"Snapshot for {snapshot_date} is already recorded and cannot be replaced.")
+
+        rows = GoalCounter.objects.filter(category=None, board__is_deleted=False).values(
+            "board_id", "status"
+        ).annotate(total=Sum("count")).filter(total__gt=0).values_list("board_id", "status", "total")
+
+        with transaction.atomic():
+            BoardProgressSnapshot.objects.filter(date=snapshot_date).delete()
+            snapshots = BoardProgressSnapshot.objects.bulk_create(
+                [BoardProgressSnapshot(board_id=board_id, date=snapshot_date, status=status, count=total)
+                 for board_id, status, total in rows.iterator()],
+                batch_size=1000,
+            )
+
+        logger.info("Board progress snapshot for %s recorded: %s rows.", snapshot_date, len(snapshots))
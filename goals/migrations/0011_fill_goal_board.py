@@ -0,0 +1,30 @@
+# Generated by Django 4.0.1 on 2026-10-18 10:14
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_boards(apps, schema_editor):
+    # Проставляем доску целям и комментариям по доске категории. Каждая таблица обновляется одним запросом UPDATE
+    # с подзапросом, без загрузки объектов в память.
+    Goal = apps.get_model("goals", "Goal")
+    GoalCategory = apps.get_model("goals", "GoalCategory")
+    GoalComment = apps.get_model("goals", "GoalComment")
+
+    Goal.objects.filter(category__isnull=False).update(
+        board_id=Subquery(GoalCategory.objects.filter(pk=OuterRef("category_id")).values("board_id")[:1])
+    )
+    GoalComment.objects.update(
+        board_id=Subquery(Goal.objects.filter(pk=OuterRef("goal_id")).values("board_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0010_goal_board_goalcomment_board'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_boards, migrations.RunPython.noop)
+    ]
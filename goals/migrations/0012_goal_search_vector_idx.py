@@ -0,0 +1,19 @@
+# Generated by Django 4.0.1 on 2026-10-18 11:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0011_fill_goal_board'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('title', 'description', config='russian'), name='goal_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.1 on 2026-10-18 11:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Django строит icontains как UPPER("поле"::text) LIKE UPPER('%...%'), поэтому триграммные индексы создаются по тому
+# же выражению, иначе PostgreSQL не сможет их использовать.
+TRIGRAM_INDEXES = [
+    ("goal_title_trgm_idx", "goals_goal", "title"),
+    ("goal_description_trgm_idx", "goals_goal", "description"),
+    ("goalcomment_text_trgm_idx", "goals_goalcomment", "text"),
+    ("goalcategory_title_trgm_idx", "goals_goalcategory", "title"),
+    ("board_title_trgm_idx", "goals_board", "title"),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0012_goal_search_vector_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ] + [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX "{name}" ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops);',
+            reverse_sql=f'DROP INDEX IF EXISTS "{name}";',
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.1 on 2026-10-18 12:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_versions(apps, schema_editor):
+    # Создаем версию для каждой существующей доски, датой изменения считаем дату последнего обновления доски
+    Board = apps.get_model("goals", "Board")
+    BoardVersion = apps.get_model("goals", "BoardVersion")
+
+    BoardVersion.objects.bulk_create(
+        [BoardVersion(board_id=board_id, modified=updated)
+         for board_id, updated in Board.objects.values_list("id", "updated").iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0013_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardVersion',
+            fields=[
+                ('board', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='version', serialize=False, to='goals.board', verbose_name='Доска')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='Версия')),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата последнего изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия доски',
+                'verbose_name_plural': 'Версии досок',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.1 on 2026-10-18 14:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('goals', '0014_boardversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated', models.DateTimeField(verbose_name='Дата последнего обновления')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'В очереди'), (2, 'Выполняется'), (3, 'Выполнено')], default=1, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Всего целей')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано целей')),
+                ('last_goal_id', models.PositiveBigIntegerField(default=0, verbose_name='Последняя обработанная цель')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archive_tasks', to='goals.board', verbose_name='Доска')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archive_tasks', to='goals.goalcategory', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Задача архивации',
+                'verbose_name_plural': 'Задачи архивации',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivetask',
+            index=models.Index(fields=['status', 'id'], name='archivetask_status_idx'),
+        ),
+    ]
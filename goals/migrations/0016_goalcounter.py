@@ -0,0 +1,54 @@
+# Generated by Django 4.0.1 on 2026-10-18 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Заполняем счетчики по существующим целям: строки по категориям и итоговые строки по доскам (с пустой категорией)
+FILL_COUNTERS_SQL = """
+    INSERT INTO goals_goalcounter (board_id, category_id, status, priority, count)
+    SELECT board_id, category_id, status, priority, COUNT(*)
+      FROM goals_goal
+     WHERE board_id IS NOT NULL AND category_id IS NOT NULL
+     GROUP BY board_id, category_id, status, priority;
+
+    INSERT INTO goals_goalcounter (board_id, category_id, status, priority, count)
+    SELECT board_id, NULL, status, priority, COUNT(*)
+      FROM goals_goal
+     WHERE board_id IS NOT NULL
+     GROUP BY board_id, status, priority;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0015_archivetask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'К выполнению'), (2, 'В процессе'), (3, 'Выполнено'), (4, 'Архив')], verbose_name='Статус')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(1, 'Низкий'), (2, 'Средний'), (3, 'Высокий'), (4, 'Критический')], verbose_name='Приоритет')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество целей')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goal_counters', to='goals.board', verbose_name='Доска')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='goal_counters', to='goals.goalcategory', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Счетчик целей',
+                'verbose_name_plural': 'Счетчики целей',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='goalcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('category', 'status', 'priority'), name='goalcounter_category_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='goalcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('board', 'status', 'priority'), name='goalcounter_board_key'),
+        ),
+        migrations.RunSQL(FILL_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
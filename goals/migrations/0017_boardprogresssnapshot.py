@@ -0,0 +1,32 @@
+# Generated by Django 4.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0016_goalcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardProgressSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'К выполнению'), (2, 'В процессе'), (3, 'Выполнено'), (4, 'Архив')], verbose_name='Статус')),
+                ('count', models.PositiveIntegerField(verbose_name='Количество целей')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='goals.board', verbose_name='Доска')),
+            ],
+            options={
+                'verbose_name': 'Снимок прогресса доски',
+                'verbose_name_plural': 'Снимки прогресса досок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='boardprogresssnapshot',
+            constraint=models.UniqueConstraint(fields=('board', 'date', 'status'), name='progress_board_date_status_key'),
+        ),
+    ]
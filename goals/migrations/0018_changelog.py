@@ -0,0 +1,32 @@
+# Generated by Django 4.0.1 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0017_boardprogresssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board_id', models.BigIntegerField(verbose_name='Доска')),
+                ('entity', models.CharField(max_length=16, verbose_name='Сущность')),
+                ('object_id', models.BigIntegerField(verbose_name='Объект')),
+                ('action', models.CharField(max_length=16, verbose_name='Действие')),
+                ('txid', models.BigIntegerField(verbose_name='Транзакция')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала изменений',
+                'verbose_name_plural': 'Журнал изменений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['board_id', 'txid'], name='changelog_board_txid_idx'),
+        ),
+    ]
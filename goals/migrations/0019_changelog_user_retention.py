@@ -0,0 +1,46 @@
+# Generated by Django 4.0.1 on 2026-10-18 20:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0018_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogPrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField(verbose_name='Транзакция')),
+                ('deleted', models.PositiveIntegerField(verbose_name='Удалено записей')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата очистки')),
+            ],
+            options={
+                'verbose_name': 'Очистка журнала изменений',
+                'verbose_name_plural': 'Очистки журнала изменений',
+            },
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата записи'),
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='user_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(condition=models.Q(('user_id__isnull', False)), fields=['user_id', 'txid'],
+                               name='changelog_user_txid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['created'], name='changelog_created_idx'),
+        ),
+    ]
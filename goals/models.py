@@ -1,8 +1,25 @@
-from django.db import models
+from collections import Counter
+from typing import Mapping
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import connection, models
 from django.utils import timezone
 
 from core.models import User
 
+# Конфигурация полнотекстового поиска по целям. Индекс и запросы поиска должны строить одно и то же выражение
+# to_tsvector, иначе PostgreSQL не сможет использовать индекс.
+GOAL_SEARCH_CONFIG = "russian"
+
+
+def goal_search_vector() -> SearchVector:
+    return SearchVector("title", "description", config=GOAL_SEARCH_CONFIG)
+
+
+# Ключ счетчика GoalCounter: (доска, категория, статус, приоритет)
+CounterKey = tuple[int | None, int | None, int, int]
+
 
 class DatesModelMixin(models.Model):
     """
@@ -38,6 +55,47 @@ class GoalCategory(DatesModelMixin):
     def __str__(self):
         return f"<{self.user.username}>: {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        # при переносе категории в другую доску переносим вслед за ней цели, комментарии к ним и счетчики целей
+        if not adding and getattr(self, "_loaded_board_id", self.board_id) != self.board_id:
+            self.goals.update(board_id=self.board_id)
+            GoalComment.objects.filter(goal__category_id=self.pk).update(board_id=self.board_id)
+            GoalCounter.move_category(self.pk, self._loaded_board_id, self.board_id)
+        self._loaded_board_id = self.board_id
+
+
+class GoalQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> "GoalQuerySet":
+        """
+        Актуальные цели из досок, в которых пользователь является участником. Фильтрация идет по полю board через
+        подзапрос к BoardParticipant, без соединения с таблицами досок и категорий.
+        """
+        return self.filter(
+            board__in=BoardParticipant.objects.filter(user=user).values("board_id"),
+        ).exclude(status=Goal.Status.archived).exclude_archiving()
+
+    def exclude_archiving(self) -> "GoalQuerySet":
+        """
+        Исключает цели удаленных досок и категорий, которые еще ждут перевода в статус «Архив» фоновой задачей
+        ArchiveTask. Условие NOT IN строится по незавершенным задачам архивации (их немного, и они выбираются по
+        индексу статуса), поэтому не требует соединения с таблицей категорий.
+        """
+        archiving = ArchiveTask.objects.filter(status__in=[ArchiveTask.Status.pending, ArchiveTask.Status.in_progress])
+        return self.exclude(
+            board__in=archiving.filter(category__isnull=True).values("board_id"),
+        ).exclude(
+            category__in=archiving.filter(category__isnull=False).values("category_id"),
+        )
+
 
 class Goal(DatesModelMixin):
     """
@@ -67,14 +125,75 @@ class Goal(DatesModelMixin):
     )
     due_date = models.DateTimeField(verbose_name="Дата дедлайна", null=True, blank=True)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    # Доска дублирует category.board, чтобы проверка участия в доске не требовала соединения с категориями.
+    # Значение проставляется автоматически в save() и не редактируется напрямую.
+    board = models.ForeignKey("Board", verbose_name="Доска", related_name="goals", on_delete=models.PROTECT,
+                              null=True, editable=False, db_index=False)
+
+    objects = GoalQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Цель"
         verbose_name_plural = "Цели"
+        indexes = [
+            models.Index(fields=["board", "status", "is_deleted", "title"], name="goal_board_status_title_idx"),
+            models.Index(fields=["board", "status", "is_deleted", "-created"], name="goal_board_status_created_idx"),
+            GinIndex(goal_search_vector(), name="goal_search_vector_idx"),
+        ]
 
     def __str__(self):
         return f"<{self.user.username}>: {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        instance._loaded_counter_key = instance.get_counter_key()
+        return instance
+
+    def get_counter_key(self) -> CounterKey | None:
+        """
+        Ключ счетчика GoalCounter для цели: (доска, категория, статус, приоритет). Если какое-либо из полей не
+        загружено из БД (only/defer), возвращается None.
+        """
+        if any(attname not in self.__dict__ for attname in ("board_id", "category_id", "status", "priority")):
+            return None
+        return self.board_id, self.category_id, self.status, self.priority
+
+    def save(self, *args, **kwargs):
+        self.board_id = self.category.board_id if self.category_id else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "category" in update_fields:
+            kwargs["update_fields"] = update_fields = {*update_fields, "board"}
+
+        adding = self._state.adding
+        loaded_key = None if adding else getattr(self, "_loaded_counter_key", None)
+        super().save(*args, **kwargs)
+
+        # при смене доски (перенос цели в категорию другой доски) переносим и комментарии к цели
+        if not adding and getattr(self, "_loaded_board_id", self.board_id) != self.board_id:
+            self.goal_comment.update(board_id=self.board_id)
+        self._loaded_board_id = self.board_id
+
+        # счетчики обновляются в той же транзакции, что и цель; поля, не вошедшие в update_fields, в БД не изменились
+        key = self.get_counter_key()
+        if update_fields is not None and loaded_key is not None:
+            key = tuple(value if field in update_fields else loaded
+                        for field, value, loaded in zip(GoalCounter.KEY_FIELDS, key, loaded_key))
+        if adding or loaded_key is not None:
+            GoalCounter.apply({key: 1} if adding else {loaded_key: -1, key: 1})
+        self._loaded_counter_key = key
+
+
+class GoalCommentQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> "GoalCommentQuerySet":
+        """
+        Комментарии к целям из актуальных досок, в которых пользователь является участником.
+        """
+        return self.filter(
+            board__in=BoardParticipant.objects.filter(user=user, board__is_deleted=False).values("board_id")
+        )
+
 
 class GoalComment(DatesModelMixin):
     """
@@ -84,14 +203,29 @@ class GoalComment(DatesModelMixin):
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.CASCADE)
     goal = models.ForeignKey(Goal, verbose_name="Цель", on_delete=models.CASCADE, related_name="goal_comment")
     text = models.TextField(verbose_name="Текст комментария", max_length=1000)
+    # Доска дублирует goal.board и проставляется автоматически в save().
+    board = models.ForeignKey("Board", verbose_name="Доска", related_name="comments", on_delete=models.PROTECT,
+                              null=True, editable=False, db_index=False)
+
+    objects = GoalCommentQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(fields=["board", "-created"], name="comment_board_created_idx"),
+        ]
 
     def __str__(self):
         return f"<{self.user.username}>: {self.text}"
 
+    def save(self, *args, **kwargs):
+        self.board_id = self.goal.board_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "goal" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "board"}
+        return super().save(*args, **kwargs)
+
 
 class Board(DatesModelMixin):
     """
@@ -129,3 +263,259 @@ class BoardParticipant(DatesModelMixin):
 
     def __str__(self):
         return f"{self.user} с ролью {self.role} включен в доску {self.board}"
+
+
+class BoardVersion(models.Model):
+    """
+    Класс BoardVersion хранит счетчик изменений доски. Версия увеличивается при любом изменении доски, ее участников,
+    категорий, целей и комментариев (см. goals/signals.py) и используется для условных GET-запросов (ETag,
+    Last-Modified): проверка актуальности данных у клиента не обращается к таблице целей.
+    """
+    board = models.OneToOneField(Board, verbose_name="Доска", on_delete=models.CASCADE, primary_key=True,
+                                 related_name="version")
+    version = models.PositiveBigIntegerField(verbose_name="Версия", default=1)
+    modified = models.DateTimeField(verbose_name="Дата последнего изменения", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Версия доски"
+        verbose_name_plural = "Версии досок"
+
+    def __str__(self):
+        return f"Доска {self.board_id}, версия {self.version}"
+
+    @classmethod
+    def bump(cls, board_ids) -> None:
+        board_ids = set(board_ids)
+        if not board_ids:
+            return
+
+        now = timezone.now()
+        updated = cls.objects.filter(board_id__in=board_ids).update(version=models.F("version") + 1, modified=now)
+        if updated < len(board_ids):
+            existing = set(cls.objects.filter(board_id__in=board_ids).values_list("board_id", flat=True))
+            cls.objects.bulk_create(
+                [cls(board_id=board_id, modified=now) for board_id in sorted(board_ids - existing)],
+                ignore_conflicts=True,
+            )
+
+
+class ArchiveTask(DatesModelMixin):
+    """
+    Класс ArchiveTask описывает фоновую задачу архивации целей удаленной доски или категории. Доска и категория
+    помечаются удаленными сразу при удалении, а цели переводятся в статус «Архив» порциями командой runarchiver
+    (см. goals/management/commands/runarchiver.py). Каждая порция выполняется в отдельной транзакции, а поле
+    last_goal_id запоминает последнюю обработанную цель, поэтому прерванная задача продолжается с места остановки.
+    """
+    class Status(models.IntegerChoices):
+        pending = 1, "В очереди"
+        in_progress = 2, "Выполняется"
+        done = 3, "Выполнено"
+
+    user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.CASCADE, related_name="archive_tasks")
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="archive_tasks")
+    category = models.ForeignKey(GoalCategory, verbose_name="Категория", on_delete=models.PROTECT, null=True,
+                                 blank=True, related_name="archive_tasks")
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.pending)
+    total = models.PositiveIntegerField(verbose_name="Всего целей", null=True, blank=True)
+    processed = models.PositiveIntegerField(verbose_name="Обработано целей", default=0)
+    last_goal_id = models.PositiveBigIntegerField(verbose_name="Последняя обработанная цель", default=0)
+
+    class Meta:
+        verbose_name = "Задача архивации"
+        verbose_name_plural = "Задачи архивации"
+        indexes = [
+            models.Index(fields=["status", "id"], name="archivetask_status_idx"),
+        ]
+
+    def __str__(self):
+        target = f"категории {self.category_id}" if self.category_id else f"доски {self.board_id}"
+        return f"Архивация {target}: {self.processed} из {self.total}"
+
+    def get_goals(self) -> GoalQuerySet:
+        if self.category_id:
+            return Goal.objects.filter(category_id=self.category_id)
+        return Goal.objects.filter(board_id=self.board_id)
+
+
+class GoalCounter(models.Model):
+    """
+    Класс GoalCounter хранит количество целей по ключу (доска, категория, статус, приоритет). Строки с пустой
+    категорией содержат итоги по доске в целом. Счетчики обновляются в одной транзакции с изменением целей (в
+    Goal.save, массовых операциях и фоновой архивации), поэтому сводка по доске или категории читается без агрегации.
+    """
+    KEY_FIELDS = ("board", "category", "status", "priority")
+
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.CASCADE, related_name="goal_counters")
+    category = models.ForeignKey(GoalCategory, verbose_name="Категория", on_delete=models.CASCADE, null=True,
+                                 blank=True, related_name="goal_counters")
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Goal.Status.choices)
+    priority = models.PositiveSmallIntegerField(verbose_name="Приоритет", choices=Goal.Priority.choices)
+    count = models.IntegerField(verbose_name="Количество целей", default=0)
+
+    class Meta:
+        verbose_name = "Счетчик целей"
+        verbose_name_plural = "Счетчики целей"
+        constraints = [
+            models.UniqueConstraint(fields=["category", "status", "priority"], name="goalcounter_category_key",
+                                    condition=models.Q(category__isnull=False)),
+            models.UniqueConstraint(fields=["board", "status", "priority"], name="goalcounter_board_key",
+                                    condition=models.Q(category__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"Доска {self.board_id}, категория {self.category_id}: {self.count}"
+
+    @classmethod
+    def apply(cls, deltas: Mapping[CounterKey, int]) -> None:
+        """
+        Прибавляет к счетчикам изменения deltas вида {(доска, категория, статус, приоритет): изменение} одним
+        запросом INSERT ... ON CONFLICT DO UPDATE для категорий и одним для итогов по доскам.
+        """
+        categories: Counter[CounterKey] = Counter()
+        boards: Counter[CounterKey] = Counter()
+        for (board_id, category_id, status, priority), delta in deltas.items():
+            if board_id is None:
+                continue
+            if category_id is not None:
+                categories[board_id, category_id, status, priority] += delta
+            boards[board_id, None, status, priority] += delta
+
+        cls.upsert(categories, conflict="(category_id, status, priority) WHERE category_id IS NOT NULL")
+        cls.upsert(boards, conflict="(board_id, status, priority) WHERE category_id IS NULL")
+
+    @classmethod
+    def move_category(cls, category_id: int, old_board_id: int | None, new_board_id: int) -> None:
+        """
+        Переносит счетчики категории в другую доску и пересчитывает итоги обеих досок.
+        """
+        rows = list(cls.objects.filter(category_id=category_id).values_list("status", "priority", "count"))
+        cls.objects.filter(category_id=category_id).update(board_id=new_board_id)
+
+        boards: Counter[CounterKey] = Counter()
+        for status, priority, count in rows:
+            if old_board_id is not None:
+                boards[old_board_id, None, status, priority] -= count
+            boards[new_board_id, None, status, priority] += count
+        cls.upsert(boards, conflict="(board_id, status, priority) WHERE category_id IS NULL")
+
+    @classmethod
+    def upsert(cls, deltas: Counter[CounterKey], conflict: str) -> None:
+        # сортировка ключей задает одинаковый порядок блокировки строк и исключает взаимные блокировки транзакций
+        rows = sorted((key for key, delta in deltas.items() if delta), key=lambda key: tuple(
+            value if value is not None else 0 for value in key
+        ))
+        if not rows:
+            return
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+        params = [value for key in rows for value in (*key, deltas[key])]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (board_id, category_id, status, priority, count) VALUES {values} "
+                f"ON CONFLICT {conflict} DO UPDATE SET count = {table}.count + EXCLUDED.count",
+                params,
+            )
+
+
+class BoardProgressSnapshot(models.Model):
+    """
+    Класс BoardProgressSnapshot хранит ежедневный снимок количества целей доски по статусам (одна строка на доску, день
+    и статус). Снимки записывает команда snapshotprogress, история используется для построения графиков сгорания
+    задач: выборка за период читается по уникальному индексу (доска, дата, статус) без пересчета целей.
+    """
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.CASCADE, related_name="progress")
+    date = models.DateField(verbose_name="Дата")
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Goal.Status.choices)
+    count = models.PositiveIntegerField(verbose_name="Количество целей")
+
+    class Meta:
+        verbose_name = "Снимок прогресса доски"
+        verbose_name_plural = "Снимки прогресса досок"
+        constraints = [
+            models.UniqueConstraint(fields=["board", "date", "status"], name="progress_board_date_status_key"),
+        ]
+
+    def __str__(self):
+        return f"Доска {self.board_id}, {self.date}: статус {self.status} - {self.count}"
+
+
+class ChangeLog(models.Model):
+    """
+    Класс ChangeLog - журнал изменений сущностей досок для инкрементальной синхронизации клиентов (goals/changes).
+    Каждая запись хранит доску, сущность, id объекта, действие и номер транзакции PostgreSQL (txid_current()), в
+    которой произошло изменение. Курсор синхронизации - граница xmin снимка БД на момент чтения: все транзакции с
+    меньшим номером уже завершены, поэтому записи, зафиксированные позже, не будут пропущены. Доска хранится числом
+    без внешнего ключа, чтобы журнал мог фиксировать и удаление доски. Для участников доски в user_id хранится
+    пользователь: по этим записям пользователь, исключенный из доски, узнает, что доска ему больше недоступна.
+    Журнал хранится ограниченное время (команда prunechanges), границу удаленных записей хранит ChangeLogPrune.
+    """
+    board_id = models.BigIntegerField(verbose_name="Доска")
+    entity = models.CharField(verbose_name="Сущность", max_length=16)
+    object_id = models.BigIntegerField(verbose_name="Объект")
+    action = models.CharField(verbose_name="Действие", max_length=16)
+    user_id = models.BigIntegerField(verbose_name="Пользователь", null=True, blank=True)
+    txid = models.BigIntegerField(verbose_name="Транзакция")
+    created = models.DateTimeField(verbose_name="Дата записи", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Запись журнала изменений"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(fields=["board_id", "txid"], name="changelog_board_txid_idx"),
+            models.Index(fields=["user_id", "txid"], name="changelog_user_txid_idx",
+                         condition=models.Q(user_id__isnull=False)),
+            models.Index(fields=["created"], name="changelog_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Доска {self.board_id}: {self.entity} {self.object_id} {self.action}"
+
+    @classmethod
+    def record(cls, changes) -> None:
+        """
+        Записывает изменения одним запросом INSERT, номер транзакции подставляет сам PostgreSQL.
+        """
+        rows = [(change.board_id, change.entity, change.object_id, change.action, change.user_id)
+                for change in changes]
+        if not rows:
+            return
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        values = ", ".join(["(%s, %s, %s, %s, %s, txid_current(), now())"] * len(rows))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (board_id, entity, object_id, action, user_id, txid, created) VALUES {values}",
+                [value for row in rows for value in row],
+            )
+
+    @staticmethod
+    def horizon() -> int:
+        """
+        Номер транзакции, до которого (включительно) записи журнала могли быть удалены: курсор не больше этого номера
+        требует полной синхронизации.
+        """
+        return ChangeLogPrune.objects.aggregate(txid=models.Max("txid"))["txid"] or 0
+
+    @staticmethod
+    def current_cursor() -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+            return cursor.fetchone()[0]
+
+
+class ChangeLogPrune(models.Model):
+    """
+    Класс ChangeLogPrune - запуск очистки журнала изменений: до какой транзакции (включительно) могли быть удалены
+    записи ChangeLog. Клиенты с курсором не новее этой границы могли пропустить изменения и синхронизируются заново.
+    """
+    txid = models.BigIntegerField(verbose_name="Транзакция")
+    deleted = models.PositiveIntegerField(verbose_name="Удалено записей")
+    created = models.DateTimeField(verbose_name="Дата очистки", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Очистка журнала изменений"
+        verbose_name_plural = "Очистки журнала изменений"
+
+    def __str__(self):
+        return f"Очистка журнала до транзакции {self.txid}"
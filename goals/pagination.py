@@ -0,0 +1,201 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Field, Model, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Пагинация по умолчанию работает как LimitOffsetPagination. Если в запросе передан параметр cursor (для первой
+    страницы - пустой, ?cursor=), включается постраничный вывод по ключу (keyset): страница выбирается условием
+    WHERE по значениям полей сортировки последней строки предыдущей страницы, а не через OFFSET, и запрос COUNT(*)
+    не выполняется. Поэтому стоимость любой страницы одинакова. Порядок берется из сортировки вьюшки (ordering) и
+    дополняется полем id, чтобы строки с одинаковыми значениями не терялись и не повторялись между страницами.
+    Ответ содержит непрозрачные курсоры next/previous без поля count.
+    """
+    cursor_query_param = "cursor"
+    default_cursor_limit = 20
+    max_cursor_limit = 1000
+    tie_breaker = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.url = request.build_absolute_uri()
+        self.limit = min(self.get_limit(request) or self.default_cursor_limit, self.max_cursor_limit)
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        order_by = [
+            f"-{field}" if descending != reverse else field for field, descending in self.ordering
+        ]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            # значения полей без модели (аннотации) не приводятся к типу заранее и проверяются при построении запроса
+            try:
+                queryset = queryset.filter(self.get_position_filter(position, reverse))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.first_position = self.get_position(rows[0]) if rows else position
+        self.last_position = self.get_position(rows[-1]) if rows else position
+        return rows
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            "name": self.cursor_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Курсор страницы. Пустое значение включает постраничный вывод по ключу без подсчета "
+                           "количества строк.",
+            "schema": {"type": "string"},
+        })
+        return parameters
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.build_link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.build_link(self.first_position, reverse=True)
+
+    def get_keyset_ordering(self, request, queryset, view) -> list[tuple[str, bool]]:
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if ordering is None:
+            ordering = getattr(view, "ordering", None) or []
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        result = [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+        if self.tie_breaker not in (field for field, _ in result):
+            descending = result[0][1] if result else False
+            result.append((self.tie_breaker, descending))
+        return result
+
+    def get_position(self, row) -> list:
+        values = []
+        for field, _ in self.ordering:
+            if isinstance(row, dict):
+                value = row[field]
+            else:
+                value = row
+                for attr in field.split("__"):
+                    value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def get_position_filter(self, position: list, reverse: bool) -> Q:
+        """
+        Строит условие «строка идет после позиции» для составного ключа сортировки:
+        (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ... с учетом направления сортировки каждого поля.
+        """
+        condition = Q()
+        for index, (field, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending != reverse else "gt"
+            step = Q(**{f"{field}__{lookup}": position[index]})
+            for prev_index, (prev_field, _) in enumerate(self.ordering[:index]):
+                step &= Q(**{prev_field: position[prev_index]})
+            condition |= step
+        return condition
+
+    def build_link(self, position: list, reverse: bool) -> str:
+        payload = json.dumps({"p": [self.encode_value(value) for value in position], "r": int(reverse)})
+        cursor = urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = remove_query_param(self.url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request, model: type[Model]) -> tuple[list[Any] | None, bool]:
+        """
+        Разбирает курсор и приводит значения позиции к типам полей сортировки: курсор приходит от клиента и мог быть
+        изменен или получен при другой сортировке.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            position, reverse = payload["p"], bool(payload["r"])
+        except (BinasciiError, UnicodeError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [self.to_python(model, field, value) for (field, _), value in zip(self.ordering, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def to_python(model: type[Model] | None, path: str, value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            raise TypeError("Cursor values must be scalar.")
+        *relations, name = path.split("__")
+        try:
+            for relation in relations:
+                model = model._meta.get_field(relation).related_model if model else None
+            field = model._meta.get_field(name) if model else None
+        except FieldDoesNotExist:
+            return value
+        # аннотации и обратные связи не приводятся к типу: значение проверит сам запрос
+        return field.to_python(value) if isinstance(field, Field) else value
+
+    @staticmethod
+    def encode_value(value):
+        # значения дат передаются строкой ISO 8601, Django приводит их обратно к типу поля при фильтрации
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
@@ -1,7 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import permissions
 
 from goals.models import BoardParticipant, GoalCategory, Board, Goal, GoalComment
 
+BOARD_ROLES_KEY = "goals:board-roles:{user_id}"
+BOARD_ROLES_VERSION_KEY = "goals:board-roles-version:{user_id}"
+
+
+def get_board_roles(request) -> dict[int, int]:
+    """
+    Возвращает роли пользователя в досках в виде словаря {board_id: role}. Словарь загружается одним запросом и
+    запоминается на объекте запроса, поэтому все проверки доступа в рамках одного запроса (permissions, валидация
+    сериализаторов) не обращаются к БД повторно. Если задан BOARD_ROLES_CACHE_TIMEOUT, словарь дополнительно
+    хранится в кэше между запросами под ключом с версией; версия меняется при любом изменении участников доски.
+    """
+    roles: dict[int, int] | None = getattr(request, "_board_roles", None)
+    if roles is None:
+        roles = load_board_roles(request.user.id)
+        request._board_roles = roles
+    return roles
+
+
+def get_board_role(request, board_id: int | None) -> int | None:
+    """
+    Возвращает роль пользователя в доске или None, если он не участник доски (или у объекта еще нет доски).
+    """
+    return get_board_roles(request).get(board_id) if board_id is not None else None
+
+
+def load_board_roles(user_id: int) -> dict[int, int]:
+    timeout = settings.BOARD_ROLES_CACHE_TIMEOUT
+    if not timeout:
+        return dict(BoardParticipant.objects.filter(user_id=user_id).values_list("board_id", "role"))
+
+    # новая версия берется из текущего времени, чтобы после вытеснения ключа версии из кэша
+    # не прочитать сохраненные ранее роли
+    version = cache.get_or_set(BOARD_ROLES_VERSION_KEY.format(user_id=user_id), time.time_ns, timeout=None)
+    key = BOARD_ROLES_KEY.format(user_id=user_id)
+    roles: dict[int, int] | None = cache.get(key, version=version)
+    if roles is None:
+        # роли для общего кэша читаются с основной БД: отстающая реплика закэшировала бы под новой версией роли без
+        # только что добавленного участника на все время жизни ключа
+        roles = dict(
+            BoardParticipant.objects.using("default").filter(user_id=user_id).values_list("board_id", "role")
+        )
+        cache.set(key, roles, timeout=timeout, version=version)
+    return roles
+
+
+def invalidate_board_roles(*user_ids: int) -> None:
+    if not settings.BOARD_ROLES_CACHE_TIMEOUT:
+        return
+    cache.set_many({BOARD_ROLES_VERSION_KEY.format(user_id=user_id): time.time_ns() for user_id in user_ids},
+                   timeout=None)
+
 
 class BoardPermissions(permissions.IsAuthenticated):
     """
@@ -10,12 +65,12 @@ class BoardPermissions(permissions.IsAuthenticated):
     Изменять/удалять доску имеет право только создатель доски.
     """
     def has_object_permission(self, request, view, obj: Board):
-        _filters: dict = {"user": request.user, "board": obj}
+        role = get_board_role(request, obj.id)
 
         if request.method not in permissions.SAFE_METHODS:
-            _filters["role"] = BoardParticipant.Role.owner
+            return role == BoardParticipant.Role.owner
 
-        return BoardParticipant.objects.filter(**_filters).exists()
+        return role is not None
 
 
 class GoalCategoryPermissions(permissions.IsAuthenticated):
@@ -25,12 +80,12 @@ class GoalCategoryPermissions(permissions.IsAuthenticated):
     Менять/удалять категорию имеет право создатель доски или редактор.
     """
     def has_object_permission(self, request, view, obj: GoalCategory):
-        _filters: dict = {"user_id": request.user.id, "board_id": obj.board_id}
+        role = get_board_role(request, obj.board_id)
 
         if request.method not in permissions.SAFE_METHODS:
-            _filters["role__in"] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
+            return role in (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
 
-        return BoardParticipant.objects.filter(**_filters).exists()
+        return role is not None
 
 
 class GoalPermissions(permissions.IsAuthenticated):
@@ -40,16 +95,12 @@ class GoalPermissions(permissions.IsAuthenticated):
     Менять/удалять цель имеет право создатель доски или редактор.
     """
     def has_object_permission(self, request, view, obj: Goal):
-        if obj.category is None:
-            category = GoalCategory.objects.create(title="Default", user=request.user)
-            obj.category = category
-
-        _filters: dict = {"user_id": request.user.id, "board_id": obj.category.board_id}
+        role = get_board_role(request, obj.board_id)
 
         if request.method not in permissions.SAFE_METHODS:
-            _filters["role__in"] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
+            return role in (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
 
-        return BoardParticipant.objects.filter(**_filters).exists()
+        return role is not None
 
 
 class GoalCommentPermissions(permissions.IsAuthenticated):
@@ -3,11 +3,16 @@ from typing import Optional
 
 from django.db import transaction
 from django.utils import timezone   # type: ignore
+from django.utils import timezone as dj_timezone
 from rest_framework import serializers
 
 from core.models import User
 from core.serializers import UserProfileSerializer
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant, ArchiveTask, GoalCounter, \
+    BoardProgressSnapshot
+from goals.fast_serializers import ValuesSerializer
+from goals.permissions import get_board_role, invalidate_board_roles
+from goals.signals import BoardChange, board_changed
 
 
 # Board
@@ -35,44 +40,117 @@ class BoardCreateSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class GoalCountSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для вывода счетчика целей GoalCounter: количество целей с заданными статусом и приоритетом.
+    """
+    class Meta:
+        model = GoalCounter
+        fields = ("status", "priority", "count")
+
+
 class BoardListSerializer(serializers.ModelSerializer):
     """
-    Сериализатор для вывода списка досок пользователя.
+    Сериализатор для вывода списка досок пользователя. Поле goal_counts содержит количество целей доски по статусам и
+    приоритетам из предзагруженного атрибута goal_totals (см. BoardListView).
     """
+    goal_counts = GoalCountSerializer(many=True, read_only=True, source="goal_totals")
+
     class Meta:
         model = Board
         read_only_fields = ("id", "created", "updated", "is_deleted")
         fields = "__all__"
 
 
+class BoardParticipantUpdateSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор участника доски для обновления доски через BoardSerializer, поля те же, что у
+    BoardParticipantSerializer. Имя пользователя не преобразуется в объект User по отдельности для каждого участника:
+    все имена разрешаются одним запросом в BoardSerializer.validate_participants.
+    """
+    role = serializers.ChoiceField(required=True, choices=BoardParticipant.Role.choices[1:])
+    user = serializers.CharField(source="user.username")
+
+    class Meta(BoardParticipantSerializer.Meta):
+        pass
+
+
 class BoardSerializer(serializers.ModelSerializer):
     """
     Сериализатор для вывода детальной информации по доске, включает дополнительно информацию по полю participants на
     основе BoardParticipantSerializer, которая показывает участников доски с их ролями в доске.
+    При обновлении участники сравниваются с текущими, и в БД записываются только изменения: новые участники
+    добавляются через bulk_create, измененные роли сохраняются через bulk_update, исключенные участники удаляются
+    одним запросом.
     """
-    participants = BoardParticipantSerializer(many=True)
+    participants = BoardParticipantUpdateSerializer(many=True)
 
     class Meta:
         model = Board
         fields = "__all__"
         read_only_fields = ("id", "created", "updated", "is_deleted")
 
+    def validate_participants(self, value: list[dict]) -> list[dict]:
+        usernames = {participant["user"]["username"] for participant in value}
+        users = User.objects.filter(username__in=usernames).in_bulk(field_name="username")
+        if missing := sorted(usernames - users.keys()):
+            raise serializers.ValidationError(f"Users not found: {', '.join(missing)}.")
+
+        for participant in value:
+            participant["user"] = users[participant["user"]["username"]]
+        return value
+
     def update(self, instance: Board, validated_data: dict) -> Board:
         with transaction.atomic():
-            # удаляем текущих участников выбранной доски, не затрагивая текущего пользователя /владельца доски
-            BoardParticipant.objects.filter(board=instance).exclude(user=self.context["request"].user).delete()
-
-            # пересоздаем участников выбранной доски на основе данных, получаемых при обновлении,
-            # назначая актуальные роли участников
-            for participant in validated_data.pop("participants", []):
-                new_participant = BoardParticipant.objects.create(board=instance, user=participant["user"],
-                                                                  role=participant["role"])
+            if "participants" in validated_data:
+                self.update_participants(instance, validated_data.pop("participants"))
             if title := validated_data.get("title"):
                 instance.title = title
                 instance.save(update_fields=["title"])
 
         return instance
 
+    def update_participants(self, board: Board, participants: list[dict]) -> None:
+        # текущий пользователь /владелец доски не затрагивается при обновлении участников
+        user = self.context["request"].user
+        current = {
+            participant.user_id: participant
+            for participant in BoardParticipant.objects.filter(board=board).exclude(user=user)
+        }
+        roles = {participant["user"].id: participant["role"] for participant in participants
+                 if participant["user"].id != user.id}
+
+        # имя timezone в этом модуле перекрыто импортом из datetime, поэтому используется псевдоним
+        now = dj_timezone.now()
+        to_create = [
+            BoardParticipant(board=board, user_id=user_id, role=role, created=now, updated=now)
+            for user_id, role in roles.items() if user_id not in current
+        ]
+        to_update = []
+        for user_id, role in roles.items():
+            participant = current.get(user_id)
+            if participant is not None and participant.role != role:
+                participant.role = role
+                participant.updated = now
+                to_update.append(participant)
+        to_delete = [participant for user_id, participant in current.items() if user_id not in roles]
+
+        # удаление выполняется одним запросом, обработчики post_delete сами сбрасывают кэш ролей и версию доски
+        BoardParticipant.objects.filter(pk__in=[participant.pk for participant in to_delete]).delete()
+        BoardParticipant.objects.bulk_update(to_update, ["role", "updated"])
+        BoardParticipant.objects.bulk_create(to_create)
+
+        # bulk_update и bulk_create не вызывают сигналы модели, поэтому кэш ролей и версия доски обновляются здесь
+        if to_update or to_create:
+            user_ids = [participant.user_id for participant in [*to_update, *to_create]]
+            transaction.on_commit(lambda: invalidate_board_roles(*user_ids))
+            board_changed.send(sender=BoardParticipant, changes=[
+                *(BoardChange(board.pk, "participant", participant.pk, BoardChange.UPDATED, participant.user_id)
+                  for participant in to_update),
+                *(BoardChange(board.pk, "participant", participant.pk, BoardChange.CREATED, participant.user_id)
+                  for participant in to_create),
+            ])
+
 
 # GoalCategory
 class GoalCategoryCreateSerializer(serializers.ModelSerializer):
@@ -95,9 +173,10 @@ class GoalCategorySerializer(serializers.ModelSerializer):
     используется сериализатор Пользователя, убрана логика с подстановкой текущего пользователя в поле user.
     Ограничения на действия, кроме просмотра, реализованы в классе GoalCategoryPermissions в файле
     goals/permissions.py. Класс GoalCategoryPermissions добавляет фильтр по разрешенным ролям пользователя, если
-    request.method не равен GET.
+    request.method не равен GET. Поле goal_counts содержит количество целей категории по статусам и приоритетам.
     """
     user = UserProfileSerializer(read_only=True)
+    goal_counts = GoalCountSerializer(many=True, read_only=True, source="goal_counters")
 
     class Meta:
         model = GoalCategory
@@ -124,15 +203,8 @@ class GoalCommentCreateSerializer(serializers.ModelSerializer):
         if value.is_deleted:
             raise serializers.ValidationError("User is prohibited to comment on deleted goals.")
 
-        if value.category is None:
-            category = GoalCategory.objects.create(title="Default", user=self.context["request"].user)
-            value.category = category
-
-        if not BoardParticipant.objects.filter(
-            user_id=self.context["request"].user.id,
-            board_id=value.category.board_id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-        ).exists():
+        role = get_board_role(self.context["request"], value.board_id)
+        if role not in (BoardParticipant.Role.owner, BoardParticipant.Role.writer):
             raise serializers.ValidationError("User is not owner of this goal.")
 
         return value
@@ -181,7 +253,7 @@ class GoalCreateSerializer(serializers.ModelSerializer):
 
             # проверяем, что категория создаваемой цели принадлежит пользователю,
             # т.е. пользователь не может создать цель в чужой категории
-            if value.user != self.context["request"].user:
+            if value.user_id != self.context["request"].user.id:
                 raise serializers.ValidationError("User is not owner of this category.")
         else:
             board = Board.objects.create(title="Default board")
@@ -226,7 +298,7 @@ class GoalSerializer(serializers.ModelSerializer):
 
             # проверяем, что категория создаваемой цели принадлежит пользователю,
             # т.е. пользователь не может создать цель в чужой категории
-            if value.user != self.context["request"].user:
+            if value.user_id != self.context["request"].user.id:
                 raise serializers.ValidationError("User is not owner of this category.")
         else:
             board = Board.objects.create(title="Default board")
@@ -241,3 +313,95 @@ class GoalSerializer(serializers.ModelSerializer):
             if value < timezone.now():
                 raise serializers.ValidationError("Due date cannot be in the past.")
         return value
+
+
+class GoalBulkUpdateItemSerializer(serializers.Serializer):
+    """
+    Сериализатор одного элемента массового обновления целей: id цели и изменяемые поля статуса, приоритета,
+    категории и дедлайна. Категория передается по id и проверяется во вьюшке GoalBulkUpdateView одним запросом для
+    всего набора.
+    """
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Goal.Status.choices, required=False)
+    priority = serializers.ChoiceField(choices=Goal.Priority.choices, required=False)
+    category = serializers.IntegerField(required=False)
+    due_date = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate_due_date(self, value):
+        if value:
+            if value < timezone.now():
+                raise serializers.ValidationError("Due date cannot be in the past.")
+        return value
+
+
+# Board snapshot
+class BoardSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для вывода доски целиком одним ответом: участники доски, актуальные категории и неархивные цели,
+    сгруппированные по колонкам статусов. Категории и цели берутся из предзагруженных атрибутов active_categories и
+    active_goals (см. BoardSnapshotView), поэтому сериализация не выполняет дополнительных запросов к БД.
+    """
+    participants = BoardParticipantSerializer(many=True, read_only=True)
+    categories = GoalCategorySerializer(many=True, read_only=True, source="active_categories")
+    columns = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Board
+        fields = "__all__"
+        read_only_fields = ("id", "created", "updated", "is_deleted")
+
+    def get_columns(self, board: Board) -> list[dict]:
+        goals_by_status: dict[int, list[Goal]] = {
+            value: [] for value in Goal.Status.values if value != Goal.Status.archived
+        }
+        # атрибут задается через Prefetch(to_attr="active_goals") в BoardSnapshotView, модель Board его не объявляет
+        active_goals: list[Goal] = getattr(board, "active_goals")
+        for goal in active_goals:
+            goals_by_status[goal.status].append(goal)
+
+        return [
+            {
+                "status": value,
+                "title": Goal.Status(value).label,
+                "goals": GoalSerializer(goals, many=True, context=self.context).data,
+            }
+            for value, goals in goals_by_status.items()
+        ]
+
+
+# ArchiveTask
+class ArchiveTaskSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для вывода задачи архивации и ее прогресса: статуса, общего числа целей и числа обработанных целей.
+    """
+    class Meta:
+        model = ArchiveTask
+        exclude = ("user", "last_goal_id")
+        read_only_fields = ("id", "created", "updated", "board", "category", "status", "total", "processed")
+
+
+# BoardProgressSnapshot
+class BoardProgressSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для вывода истории прогресса доски: количество целей с заданным статусом на дату.
+    """
+    class Meta:
+        model = BoardProgressSnapshot
+        fields = ("date", "status", "count")
+
+
+# Быстрый вывод списков через .values() (см. goals/fast_serializers.py)
+def load_category_goal_counts(items: list[dict]) -> None:
+    counts: dict[int, list[dict]] = {item["id"]: [] for item in items}
+    for category_id, status, priority, count in GoalCounter.objects.filter(category_id__in=counts).exclude(
+        count=0
+    ).order_by("status", "priority").values_list("category_id", "status", "priority", "count"):
+        counts[category_id].append({"status": status, "priority": priority, "count": count})
+    for item in items:
+        item["goal_counts"] = counts[item["id"]]
+
+
+goal_values_serializer = ValuesSerializer(GoalSerializer)
+goal_comment_values_serializer = ValuesSerializer(GoalCommentSerializer)
+goal_category_values_serializer = ValuesSerializer(GoalCategorySerializer,
+                                                   batch_fields={"goal_counts": load_category_goal_counts})
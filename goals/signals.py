@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from goals.events import get_broker
+from goals.models import Board, BoardParticipant, BoardVersion, ChangeLog, Goal, GoalCategory, GoalComment, \
+    GoalCounter
+from goals.permissions import invalidate_board_roles
+
+
+@dataclass(frozen=True)
+class BoardChange:
+    """
+    Описание одного изменения на доске: какая сущность (board, participant, category, goal, comment) с каким id
+    была создана, обновлена или удалена.
+    """
+    board_id: int
+    entity: str
+    object_id: int
+    action: str
+    # для участников доски - пользователь, чье участие изменилось
+    user_id: int | None = None
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+# Сигнал отправляется после любых изменений сущностей доски с аргументом changes: list[BoardChange].
+# Для изменений через save()/delete() его отправляют обработчики ниже, массовые операции (update, bulk_create,
+# bulk_update) должны отправлять его сами.
+board_changed = Signal()
+
+ENTITIES = {
+    Board: "board",
+    BoardParticipant: "participant",
+    GoalCategory: "category",
+    Goal: "goal",
+    GoalComment: "comment",
+}
+
+
+def get_board_id(instance) -> int | None:
+    return instance.pk if isinstance(instance, Board) else instance.board_id
+
+
+def get_user_id(instance) -> int | None:
+    return instance.user_id if isinstance(instance, BoardParticipant) else None
+
+
+@receiver(post_save)
+def send_board_saved(sender, instance, created: bool, raw: bool = False, **kwargs):
+    entity = ENTITIES.get(sender)
+    if entity is None or raw:
+        return
+
+    changes = []
+    board_id, user_id = get_board_id(instance), get_user_id(instance)
+    # при переносе цели в другую доску для старой доски цель считается удаленной
+    loaded_board_id = getattr(instance, "_loaded_board_id", board_id)
+    if not created and loaded_board_id is not None and loaded_board_id != board_id:
+        changes.append(BoardChange(loaded_board_id, entity, instance.pk, BoardChange.DELETED, user_id))
+    if board_id is not None:
+        changes.append(BoardChange(board_id, entity, instance.pk,
+                                   BoardChange.CREATED if created else BoardChange.UPDATED, user_id))
+
+    if changes:
+        board_changed.send(sender=sender, changes=changes)
+
+
+@receiver(post_delete)
+def send_board_deleted(sender, instance, **kwargs):
+    entity = ENTITIES.get(sender)
+    board_id = get_board_id(instance) if entity else None
+    if board_id is None:
+        return
+
+    board_changed.send(sender=sender, changes=[
+        BoardChange(board_id, entity, instance.pk, BoardChange.DELETED, get_user_id(instance))
+    ])
+
+
+@receiver(board_changed)
+def bump_board_versions(sender, changes: list[BoardChange], **kwargs):
+    # версия удаленной доски удаляется вместе с ней, увеличивать ее не нужно
+    BoardVersion.bump(
+        change.board_id for change in changes
+        if not (change.entity == "board" and change.action == BoardChange.DELETED)
+    )
+
+
+@receiver(board_changed)
+def record_board_changes(sender, changes: list[BoardChange], **kwargs):
+    ChangeLog.record(changes)
+
+
+@receiver(board_changed)
+def publish_board_events(sender, changes: list[BoardChange], **kwargs):
+    # события отправляются подписчикам только после фиксации транзакции, откатанные изменения не публикуются
+    # user_id нужен только журналу изменений, в событиях доски он не передается
+    events = [
+        {"board_id": change.board_id, "entity": change.entity, "object_id": change.object_id, "action": change.action}
+        for change in changes
+    ]
+    transaction.on_commit(lambda: get_broker().publish(events))
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def reset_board_roles(sender, instance: BoardParticipant, **kwargs):
+    # сбрасываем кэш ролей после фиксации транзакции, чтобы параллельный запрос не закэшировал старые роли
+    transaction.on_commit(lambda: invalidate_board_roles(instance.user_id))
+
+
+@receiver(post_delete, sender=Goal)
+def decrement_goal_counters(sender, instance: Goal, **kwargs):
+    if (key := instance.get_counter_key()) is not None:
+        GoalCounter.apply({key: -1})
@@ -10,8 +10,12 @@ urlpatterns = [
 
     path("goal/create", views.GoalCreateView.as_view(), name="goal-create"),
     path("goal/list", views.GoalListView.as_view(), name="goal-list"),
+    path("goal/export", views.GoalExportView.as_view(), name="goal-export"),
+    path("goal/bulk_update", views.GoalBulkUpdateView.as_view(), name="goal-bulk-update"),
     path("goal/<int:pk>", views.GoalView.as_view(), name="goal-detail"),
 
+    path("changes", views.ChangesView.as_view(), name="changes"),
+
     path("goal_comment/create", views.GoalCommentCreateView.as_view(), name="comment-create"),
     path("goal_comment/list", views.GoalCommentListView.as_view(), name="comment-list"),
     path("goal_comment/<int:pk>", views.GoalCommentView.as_view(), name="comment-detail"),
@@ -19,6 +23,21 @@ urlpatterns = [
     path("board/create", views.BoardCreateView.as_view(), name="board-create"),
     path("board/list", views.BoardListView.as_view(), name="board-list"),
     path("board/<int:pk>", views.BoardView.as_view(), name="board-detail"),
+    path("board/<int:pk>/snapshot", views.BoardSnapshotView.as_view(), name="board-snapshot"),
+    path("board/<int:pk>/import", views.BoardImportView.as_view(), name="board-import"),
+    path("board/<int:pk>/progress", views.BoardProgressView.as_view(), name="board-progress"),
+
+    path("archive_task/list", views.ArchiveTaskListView.as_view(), name="archivetask-list"),
+    path("archive_task/<int:pk>", views.ArchiveTaskView.as_view(), name="archivetask-detail"),
+
+    path("async/goal_category/list", views.GoalCategoryListAsyncView.as_view(), name="category-list-async"),
+    path("async/goal_category/<int:pk>", views.GoalCategoryAsyncView.as_view(), name="category-detail-async"),
+    path("async/goal/list", views.GoalListAsyncView.as_view(), name="goal-list-async"),
+    path("async/goal/<int:pk>", views.GoalAsyncView.as_view(), name="goal-detail-async"),
+    path("async/goal_comment/list", views.GoalCommentListAsyncView.as_view(), name="comment-list-async"),
+    path("async/goal_comment/<int:pk>", views.GoalCommentAsyncView.as_view(), name="comment-detail-async"),
+    path("async/board/list", views.BoardListAsyncView.as_view(), name="board-list-async"),
+    path("async/board/<int:pk>", views.BoardAsyncView.as_view(), name="board-detail-async"),
 
     # для проверки пар доска-юзер на бэкэнде
     path("board_participant/list", views.BoardParticipantListView.as_view(), name="boardparticipant-list"),
@@ -1,16 +1,78 @@
+import hashlib
+import io
+from collections import Counter
+from datetime import datetime
+from typing import Any, cast
+
 from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework import permissions, filters
-from rest_framework.pagination import LimitOffsetPagination
-
-from goals.filters import GoalDateFilter
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
-from goals.permissions import BoardPermissions, GoalCategoryPermissions, GoalPermissions, GoalCommentPermissions
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.generics import CreateAPIView, GenericAPIView, ListAPIView, RetrieveAPIView, \
+    RetrieveUpdateDestroyAPIView
+from rest_framework import permissions, filters, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.models import User
+from goals.async_views import AsyncViewMixin
+from goals.fast_serializers import ValuesListMixin
+from goals.exports import export_csv, export_ndjson
+from goals.importers import GoalImporter, IMPORT_FORMATS
+from goals.filters import BoardProgressFilter, GoalDateFilter, GoalExportFilter, GoalSearchFilter
+from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant, BoardVersion, \
+    ArchiveTask, GoalCounter, BoardProgressSnapshot, ChangeLog, CounterKey
+from goals.pagination import KeysetLimitOffsetPagination
+from goals.permissions import BoardPermissions, GoalCategoryPermissions, GoalPermissions, GoalCommentPermissions, \
+    get_board_roles
 
 from goals.serializers import GoalCategoryCreateSerializer, GoalCategorySerializer, GoalCreateSerializer, \
     GoalCommentCreateSerializer, GoalSerializer, GoalCommentSerializer, BoardSerializer, BoardCreateSerializer, \
-    BoardParticipantSerializer, BoardListSerializer
+    BoardParticipantSerializer, BoardListSerializer, BoardSnapshotSerializer, GoalBulkUpdateItemSerializer, \
+    ArchiveTaskSerializer, BoardProgressSnapshotSerializer, goal_values_serializer, goal_comment_values_serializer, \
+    goal_category_values_serializer
+from goals.signals import BoardChange, board_changed
+
+
+# Conditional GET
+def user_boards_etag(request, *args, **kwargs) -> str:
+    """
+    ETag для списков целей и категорий строится из версий всех досок пользователя, URL запроса (фильтры, сортировка,
+    пагинация) и формата ответа. Проверка выполняет один запрос к таблице версий и не обращается к таблице целей.
+    Last-Modified для списков не выдается: при исключении пользователя из доски набор досок уменьшается, и дата
+    последнего изменения может стать меньше, чем у уже полученного клиентом списка.
+    """
+    versions = BoardVersion.objects.filter(
+        board_id__in=BoardParticipant.objects.filter(user=request.user).values("board_id")
+    ).order_by("board_id").values_list("board_id", "version")
+    key = f"{request.user.id}|{request.accepted_renderer.format}|{request.get_full_path()}|{list(versions)}"
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def get_board_version(request, pk: int) -> tuple[int, datetime] | None:
+    # версия запоминается на запросе вместе с None, чтобы ETag и Last-Modified не выполняли запрос дважды
+    if hasattr(request, "_board_version"):
+        return request._board_version
+
+    version: tuple[int, datetime] | None = None
+    if pk in get_board_roles(request):
+        version = BoardVersion.objects.filter(board_id=pk).values_list("version", "modified").first()
+    request._board_version = version
+    return version
+
+
+def board_etag(request, pk: int) -> str | None:
+    version = get_board_version(request, pk)
+    return f"{pk}-{version[0]}-{request.accepted_renderer.format}" if version else None
+
+
+def board_last_modified(request, pk: int) -> datetime | None:
+    version = get_board_version(request, pk)
+    return version[1] if version else None
 
 
 # GoalCategory
@@ -23,7 +85,8 @@ class GoalCategoryCreateView(CreateAPIView):
     serializer_class = GoalCategoryCreateSerializer
 
 
-class GoalCategoryListView(ListAPIView):
+@method_decorator(condition(etag_func=user_boards_etag), name="get")
+class GoalCategoryListView(ValuesListMixin, ListAPIView):
     """
     Позволяет пользователю с разрешениями IsAuthenticated, GoalCategoryPermissions видеть информацию по
     актуальным категориям, в досках которых он является участником, а также созданные им категории.
@@ -32,7 +95,8 @@ class GoalCategoryListView(ListAPIView):
     model = GoalCategory
     permission_classes = [permissions.IsAuthenticated, GoalCategoryPermissions]
     serializer_class = GoalCategorySerializer
-    pagination_class = LimitOffsetPagination
+    values_serializer = goal_category_values_serializer
+    pagination_class = KeysetLimitOffsetPagination
 
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ["board", "user"]
@@ -41,7 +105,11 @@ class GoalCategoryListView(ListAPIView):
     search_fields = ["title"]
 
     def get_queryset(self):
-        return GoalCategory.objects.filter(board__participants__user=self.request.user, is_deleted=False)
+        return GoalCategory.objects.filter(
+            board__participants__user=self.request.user, is_deleted=False
+        ).select_related("user").prefetch_related(
+            Prefetch("goal_counters", queryset=GoalCounter.objects.exclude(count=0).order_by("status", "priority"))
+        )
 
 
 class GoalCategoryView(RetrieveUpdateDestroyAPIView):
@@ -50,20 +118,25 @@ class GoalCategoryView(RetrieveUpdateDestroyAPIView):
     актуальным категориям, в досках которых он является участником, а также созданные им категории. Пользователь
     может обновлять или удалять категорию в зависимости от прописанных ролей доступа и участия в доске.
     При удалении категории все цели этой категории переходят в статус «Архив» и не показываются в списке актуальных
-    целей, однако остаются в БД.
+    целей, однако остаются в БД. Категория скрывается сразу, а цели архивируются в фоновой задаче ArchiveTask.
     """
     model = GoalCategory
     serializer_class = GoalCategorySerializer
     permission_classes = [permissions.IsAuthenticated, GoalCategoryPermissions]
 
     def get_queryset(self):
-        return GoalCategory.objects.filter(board__participants__user=self.request.user, is_deleted=False)
+        return GoalCategory.objects.filter(
+            board__participants__user=self.request.user, is_deleted=False
+        ).select_related("user").prefetch_related(
+            Prefetch("goal_counters", queryset=GoalCounter.objects.exclude(count=0).order_by("status", "priority"))
+        )
 
     def perform_destroy(self, instance: GoalCategory):
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
-            instance.goals.update(status=Goal.Status.archived)
+            ArchiveTask.objects.create(user=cast(User, self.request.user), board_id=instance.board_id,
+                                       category=instance)
         return instance
 
 
@@ -77,7 +150,8 @@ class GoalCreateView(CreateAPIView):
     serializer_class = GoalCreateSerializer
 
 
-class GoalListView(ListAPIView):
+@method_decorator(condition(etag_func=user_boards_etag), name="get")
+class GoalListView(ValuesListMixin, ListAPIView):
     """
     Позволяет пользователю с разрешениями IsAuthenticated, GoalPermissions видеть список актуальных целей, в досках
     которых он является участником, а также созданные им цели.
@@ -88,17 +162,17 @@ class GoalListView(ListAPIView):
     model = Goal
     permission_classes = [permissions.IsAuthenticated, GoalPermissions]
     serializer_class = GoalSerializer
-    pagination_class = LimitOffsetPagination
+    values_serializer = goal_values_serializer
+    pagination_class = KeysetLimitOffsetPagination
 
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, GoalSearchFilter]
     filterset_class = GoalDateFilter
     ordering_fields = ["title", "created"]
     ordering = ["title"]
     search_fields = ["title", "description"]
 
     def get_queryset(self):
-        return Goal.objects.filter(category__board__participants__user=self.request.user,
-                                   category__is_deleted=False).exclude(status=Goal.Status.archived)
+        return Goal.objects.visible_to(self.request.user).select_related("user")
 
 
 class GoalView(RetrieveUpdateDestroyAPIView):
@@ -114,8 +188,7 @@ class GoalView(RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, GoalPermissions]
 
     def get_queryset(self):
-        return Goal.objects.filter(category__board__participants__user=self.request.user,
-                                   category__is_deleted=False).exclude(status=Goal.Status.archived)
+        return Goal.objects.visible_to(self.request.user).select_related("user")
 
     def perform_destroy(self, instance: Goal):
         with transaction.atomic():
@@ -125,6 +198,241 @@ class GoalView(RetrieveUpdateDestroyAPIView):
             return instance
 
 
+class GoalBulkUpdateView(GenericAPIView):
+    """
+    Позволяет пользователю с разрешением IsAuthenticated изменить статус, приоритет, категорию и дедлайн у набора
+    целей одним запросом (перетаскивание карточек, групповое редактирование). Принимает список изменений
+    [{"id": ..., "status": ..., "priority": ..., "category": ..., "due_date": ...}]. Цели, категории и роли
+    пользователя загружаются одним запросом на весь набор, изменения сохраняются через bulk_update в одной
+    транзакции. Правила доступа те же, что у GoalPermissions и GoalSerializer: менять цели может создатель доски или
+    редактор, назначать можно только свои актуальные категории. Ошибки возвращаются по индексу элемента, корректные
+    элементы сохраняются. В ответе возвращаются id измененных целей и ошибки.
+    """
+    model = Goal
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = GoalBulkUpdateItemSerializer
+    max_items = 500
+
+    def patch(self, request: Request, *args, **kwargs) -> Response:
+        # тело запроса может быть любым JSON-значением, хотя заглушки DRF описывают request.data как словарь
+        data: Any = request.data
+        if not isinstance(data, list):
+            raise ValidationError("Expected a list of goal changes.")
+        if len(data) > self.max_items:
+            raise ValidationError(f"No more than {self.max_items} goals can be updated at once.")
+
+        errors: dict[int, Any] = {}
+        items: dict[int, Any] = {}
+        for index, item in enumerate(data):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                items[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+
+        writer_roles = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+        roles = get_board_roles(request)
+        changed: dict[int, Goal] = {}
+        moved: dict[int, list[int]] = {}
+        board_changes: list[BoardChange] = []
+
+        with transaction.atomic():
+            # блокируются только строки целей, без строк таблиц из условий фильтра
+            goals = Goal.objects.visible_to(cast(User, request.user)).select_for_update(of=("self",)).in_bulk(
+                [item["id"] for item in items.values()]
+            )
+            categories = GoalCategory.objects.filter(is_deleted=False).in_bulk(
+                [item["category"] for item in items.values() if "category" in item]
+            )
+
+            for index, item in items.items():
+                goal = goals.get(item["id"])
+                if goal is None:
+                    errors[index] = {"id": ["Goal not found."]}
+                    continue
+                if roles.get(goal.board_id) not in writer_roles:
+                    errors[index] = {"id": ["User is not allowed to change this goal."]}
+                    continue
+
+                if "category" in item:
+                    category = categories.get(item["category"])
+                    if category is None:
+                        errors[index] = {"category": ["User is prohibited to assign deleted categories for goals."]}
+                        continue
+                    if category.user_id != request.user.id or roles.get(category.board_id) not in writer_roles:
+                        errors[index] = {"category": ["User is not owner of this category."]}
+                        continue
+                    if category.board_id != goal.board_id:
+                        board_changes.append(BoardChange(goal.board_id, "goal", goal.pk, BoardChange.DELETED))
+                        moved.setdefault(category.board_id, []).append(goal.pk)
+                    goal.category = category
+                    goal.board_id = category.board_id
+
+                for field in ("status", "priority", "due_date"):
+                    if field in item:
+                        setattr(goal, field, item[field])
+                goal.updated = timezone.now()
+                changed[goal.pk] = goal
+                board_changes.append(BoardChange(goal.board_id, "goal", goal.pk, BoardChange.UPDATED))
+
+            Goal.objects.bulk_update(changed.values(), ["category", "board", "status", "priority", "due_date",
+                                                        "updated"])
+            counters: Counter[CounterKey] = Counter()
+            for goal in changed.values():
+                # цели загружены целиком, поэтому оба ключа известны
+                loaded_key, key = goal._loaded_counter_key, goal.get_counter_key()
+                if loaded_key is not None and key is not None:
+                    counters[loaded_key] -= 1
+                    counters[key] += 1
+            GoalCounter.apply(counters)
+
+            # комментарии перенесенных целей переходят в новую доску вместе с целью
+            for board_id, goal_ids in moved.items():
+                GoalComment.objects.filter(goal_id__in=goal_ids).update(board_id=board_id)
+
+            if board_changes:
+                board_changed.send(sender=Goal, changes=board_changes)
+
+        return Response({
+            "updated": sorted(changed),
+            "errors": errors,
+        })
+
+
+class GoalExportView(GenericAPIView):
+    """
+    Позволяет пользователю с разрешением IsAuthenticated выгрузить все свои актуальные цели (по умолчанию вместе с
+    категориями) потоком в формате NDJSON (?output=ndjson) или CSV (?output=csv), с комментариями при ?comments=true.
+    Данные читаются серверным курсором порциями и сразу отправляются клиенту, поэтому расход памяти не зависит от
+    числа целей. Поддерживаются фильтры по доске, категории, статусу, приоритету и дедлайну.
+    """
+    model = Goal
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = GoalExportFilter
+    content_types = {
+        "ndjson": "application/x-ndjson; charset=utf-8",
+        "csv": "text/csv; charset=utf-8",
+    }
+
+    def get_queryset(self):
+        return Goal.objects.visible_to(self.request.user)
+
+    def perform_content_negotiation(self, request, force=False):
+        # ответ формируется не рендерером DRF, поэтому заголовок Accept клиента (например, text/csv) не проверяется
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        output = request.query_params.get("output", "ndjson")
+        if output not in self.content_types:
+            raise ValidationError({"output": [f"Supported formats: {', '.join(self.content_types)}."]})
+        with_comments = request.query_params.get("comments", "").lower() in ("1", "true")
+
+        filterset = DjangoFilterBackend().get_filterset(request, self.get_queryset(), self)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        goals = filterset.qs
+
+        if output == "csv":
+            content = export_csv(goals, with_comments)
+        else:
+            categories = GoalCategory.objects.filter(board__participants__user=cast(User, request.user),
+                                                     is_deleted=False)
+            if board := filterset.form.cleaned_data.get("board"):
+                categories = categories.filter(board=board)
+            content = export_ndjson(goals, categories, with_comments)
+
+        response = StreamingHttpResponse(content, content_type=self.content_types[output])
+        response["Content-Disposition"] = f'attachment; filename="goals.{output}"'
+        # nginx не должен буферизовать ответ, иначе клиент не получит первые байты сразу
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class ChangesView(GenericAPIView):
+    """
+    Позволяет пользователю с разрешением IsAuthenticated получить все изменения в своих досках после курсора
+    ?since= (инкрементальная синхронизация клиентов). Изменения читаются из журнала ChangeLog по индексу (доска,
+    транзакция), для каждой измененной сущности выводится ее текущее состояние, а для удаленных, архивированных и
+    ставших недоступными - запись в deleted. Если пользователя исключили из доски, в deleted выводится сама доска:
+    клиент удаляет ее вместе с категориями, целями и комментариями. Ответ содержит новый курсор для следующего
+    запроса. Без курсора, с курсором старше очищенной части журнала или при слишком большом числе изменений
+    возвращается full_sync_required: клиент должен заново загрузить списки.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_changes = 5000
+    # курсор берется из снимка транзакций основной БД, поэтому журнал читается оттуда же: на отстающей реплике
+    # изменения до курсора могли еще не появиться, и клиент пропустил бы их
+    replica_reads = False
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        since = request.query_params.get("since")
+        if since is not None and not since.isdigit():
+            raise ValidationError({"since": ["Invalid cursor."]})
+
+        # курсор берется до чтения журнала: все транзакции до него завершены и будут видны в запросе ниже
+        cursor = str(ChangeLog.current_cursor())
+        if since is None or int(since) <= ChangeLog.horizon():
+            return Response({"cursor": cursor, "full_sync_required": True})
+
+        board_ids = list(get_board_roles(request))
+        changed: dict[str, set[int]] = {}
+        rows = ChangeLog.objects.filter(
+            board_id__in=board_ids, txid__gte=int(since)
+        ).values_list("entity", "object_id").distinct()[:self.max_changes + 1]
+        for entity, object_id in rows:
+            changed.setdefault(entity, set()).add(object_id)
+        if sum(map(len, changed.values())) > self.max_changes:
+            return Response({"cursor": cursor, "full_sync_required": True})
+
+        result = {"cursor": cursor, "full_sync_required": False}
+        deleted: list[dict] = []
+        for entity, key, queryset, serialize in self.get_sources(request.user):
+            ids = changed.get(entity, set())
+            items = serialize(queryset.filter(pk__in=ids).order_by("pk")) if ids else []
+            result[key] = items
+            found = {item["id"] for item in items}
+            deleted.extend({"entity": entity, "id": object_id} for object_id in sorted(ids - found))
+
+        # журнал досок, из которых пользователя исключили, ему больше не доступен: такие доски находятся по записям
+        # об изменении его участия
+        lost_boards = ChangeLog.objects.filter(
+            entity="participant", user_id=cast(User, request.user).id, txid__gte=int(since)
+        ).exclude(board_id__in=board_ids).values_list("board_id", flat=True).distinct()
+        deleted.extend({"entity": "board", "id": board_id} for board_id in sorted(lost_boards))
+        result["deleted"] = deleted
+        return Response(result)
+
+    @staticmethod
+    def get_sources(user) -> list[tuple]:
+        """
+        Для каждой сущности журнала: ключ ответа, queryset доступных пользователю объектов и функция сериализации.
+        Объекты, которых нет в queryset, выводятся в deleted.
+        """
+        def values(serializer):
+            return lambda queryset: serializer.serialize(serializer.values(queryset))
+
+        def model(serializer_class):
+            return lambda queryset: serializer_class(queryset, many=True).data
+
+        boards = Board.objects.filter(participants__user=user, is_deleted=False).prefetch_related(
+            Prefetch("goal_counters", to_attr="goal_totals",
+                     queryset=GoalCounter.objects.filter(category=None).exclude(count=0).order_by("status", "priority"))
+        )
+        participants = BoardParticipant.objects.filter(
+            board__participants__user=user, board__is_deleted=False
+        ).select_related("user")
+        categories = GoalCategory.objects.filter(board__participants__user=user, is_deleted=False)
+
+        return [
+            ("board", "boards", boards, model(BoardListSerializer)),
+            ("participant", "participants", participants, model(BoardParticipantSerializer)),
+            ("category", "categories", categories, values(goal_category_values_serializer)),
+            ("goal", "goals", Goal.objects.visible_to(user), values(goal_values_serializer)),
+            ("comment", "comments", GoalComment.objects.visible_to(user), values(goal_comment_values_serializer)),
+        ]
+
+
 # GoalComment
 class GoalCommentCreateView(CreateAPIView):
     """
@@ -135,7 +443,7 @@ class GoalCommentCreateView(CreateAPIView):
     serializer_class = GoalCommentCreateSerializer
 
 
-class GoalCommentListView(ListAPIView):
+class GoalCommentListView(ValuesListMixin, ListAPIView):
     """
     Позволяет пользователю с разрешениями IsAuthenticated, GoalCommentPermissions видеть список своих комментариев и
     комментарии к актуальным целям и категориям, в досках которых он является участником.
@@ -145,14 +453,15 @@ class GoalCommentListView(ListAPIView):
     model = GoalComment
     permission_classes = [permissions.IsAuthenticated, GoalCommentPermissions]
     serializer_class = GoalCommentSerializer
-    pagination_class = LimitOffsetPagination
+    values_serializer = goal_comment_values_serializer
+    pagination_class = KeysetLimitOffsetPagination
 
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['goal']
     ordering = ["-created"]
 
     def get_queryset(self):
-        return GoalComment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.visible_to(self.request.user).select_related("user")
 
 
 class GoalCommentView(RetrieveUpdateDestroyAPIView):
@@ -167,7 +476,7 @@ class GoalCommentView(RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, GoalCommentPermissions]
 
     def get_queryset(self):
-        return GoalComment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.visible_to(self.request.user).select_related("user")
 
 
 # Board
@@ -193,7 +502,7 @@ class BoardListView(ListAPIView):
     model = Board
     permission_classes = [permissions.IsAuthenticated, BoardPermissions]
     serializer_class = BoardListSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetLimitOffsetPagination
 
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     ordering_fields = ["title"]
@@ -201,39 +510,185 @@ class BoardListView(ListAPIView):
     search_fields = ["title"]
 
     def get_queryset(self):
-        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False).prefetch_related(
+            Prefetch("goal_counters", to_attr="goal_totals",
+                     queryset=GoalCounter.objects.filter(category=None).exclude(count=0)
+                     .order_by("status", "priority"))
+        )
 
 
+@method_decorator(condition(etag_func=board_etag, last_modified_func=board_last_modified), name="get")
 class BoardView(RetrieveUpdateDestroyAPIView):
     """
     Позволяет пользователю с разрешениями IsAuthenticated, BoardPermissions видеть информацию по созданным пользователем
     актуальным доскам и доскам, в которых пользователь является участником. Фильтрация по актуальным доскам идет
     через participants. Пользователь с ролью "владелец" может обновлять или удалять доску.
     При удалении доски помечаем ее статус как is_deleted, присвоенные доске категории получают статус
-    удалена/архивирована, цели получают статус архивирована, но не удаляются из БД.
+    удалена/архивирована, цели получают статус архивирована, но не удаляются из БД. Доска и категории скрываются сразу,
+    а цели архивируются порциями в фоновой задаче ArchiveTask, поэтому удаление не зависит от размера доски.
     """
     model = Board
     permission_classes = [permissions.IsAuthenticated, BoardPermissions]
     serializer_class = BoardSerializer
 
     def get_queryset(self):
-        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False).prefetch_related(
+            Prefetch("participants", queryset=BoardParticipant.objects.select_related("user"))
+        )
 
     def perform_destroy(self, instance: Board):
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
             instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+            ArchiveTask.objects.create(user=cast(User, self.request.user), board=instance)
         return instance
 
 
+class BoardSnapshotView(RetrieveAPIView):
+    """
+    Позволяет пользователю с разрешениями IsAuthenticated, BoardPermissions получить доску целиком одним запросом:
+    участников, актуальные категории и неархивные цели, сгруппированные по колонкам статусов. Цели удаленных категорий
+    не выводятся и до того, как фоновая задача ArchiveTask переведет их в архив. Данные загружаются фиксированным
+    числом запросов с предзагрузкой, независимо от размера доски.
+    """
+    model = Board
+    permission_classes = [permissions.IsAuthenticated, BoardPermissions]
+    serializer_class = BoardSnapshotSerializer
+
+    def get_queryset(self):
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False).prefetch_related(
+            Prefetch("participants", queryset=BoardParticipant.objects.select_related("user")),
+            Prefetch("categories", to_attr="active_categories",
+                     queryset=GoalCategory.objects.filter(is_deleted=False).select_related("user").order_by("title")
+                     .prefetch_related(Prefetch("goal_counters", queryset=GoalCounter.objects.exclude(count=0)
+                                                .order_by("status", "priority")))),
+            Prefetch("goals", to_attr="active_goals",
+                     queryset=Goal.objects.exclude(status=Goal.Status.archived).exclude_archiving()
+                     .select_related("user").order_by("title")),
+        )
+
+
+class BoardProgressView(ListAPIView):
+    """
+    Позволяет участнику доски с разрешением IsAuthenticated получить историю количества целей доски по статусам за
+    период (для графика сгорания задач). Данные берутся из ежедневных снимков BoardProgressSnapshot, встроена
+    фильтрация по датам (date__gte, date__lte) и статусу.
+    """
+    model = BoardProgressSnapshot
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BoardProgressSnapshotSerializer
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BoardProgressFilter
+
+    def get_queryset(self):
+        if self.kwargs["pk"] not in get_board_roles(self.request):
+            raise NotFound
+        return BoardProgressSnapshot.objects.filter(board_id=self.kwargs["pk"]).order_by("date", "status")
+
+
+class BoardImportView(GenericAPIView):
+    """
+    Позволяет создателю доски или редактору с разрешением IsAuthenticated загрузить в доску цели из файла CSV или
+    NDJSON (поле file, формат определяется параметром ?input= или расширением файла). Категории указываются
+    названием и создаются при необходимости, строки проверяются и сохраняются порциями через GoalImporter. Файл
+    ожидается в UTF-8. В ответе возвращается число созданных целей и категорий и ошибки по номерам строк.
+    """
+    model = Board
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        board = Board.objects.filter(pk=self.kwargs["pk"], is_deleted=False).first()
+        if board is None or board.pk not in get_board_roles(request):
+            raise NotFound
+        if get_board_roles(request)[board.pk] not in (BoardParticipant.Role.owner, BoardParticipant.Role.writer):
+            raise PermissionDenied
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["No file was submitted."]})
+        input_format = request.query_params.get("input") or upload.name.rsplit(".", 1)[-1].lower()
+        if input_format not in IMPORT_FORMATS:
+            raise ValidationError({"input": [f"Supported formats: {', '.join(IMPORT_FORMATS)}."]})
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        result = GoalImporter(board, cast(User, request.user)).run(stream, input_format)
+        return Response({
+            "created": result.created,
+            "categories_created": result.categories_created,
+            "errors": result.errors,
+        }, status=status.HTTP_400_BAD_REQUEST if result.errors and not result.created else status.HTTP_201_CREATED)
+
+
 # для проверки на бэкэнде: вывод списка пар для модели BoardParticipant
 class BoardParticipantListView(ListAPIView):
     model = BoardParticipant
     permission_classes = [permissions.IsAuthenticated, BoardPermissions]
     serializer_class = BoardParticipantSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetLimitOffsetPagination
 
     def get_queryset(self):
-        return BoardParticipant.objects.filter(user=self.request.user)
+        return BoardParticipant.objects.filter(user=self.request.user).select_related("user")
+
+
+# ArchiveTask
+class ArchiveTaskListView(ListAPIView):
+    """
+    Позволяет пользователю с разрешением IsAuthenticated видеть запущенные им задачи архивации целей удаленных досок и
+    категорий и следить за их выполнением.
+    """
+    model = ArchiveTask
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchiveTaskSerializer
+    pagination_class = KeysetLimitOffsetPagination
+    ordering = ["-id"]
+
+    def get_queryset(self):
+        return ArchiveTask.objects.filter(user=self.request.user).order_by(*self.ordering)
+
+
+class ArchiveTaskView(RetrieveAPIView):
+    """
+    Позволяет пользователю с разрешением IsAuthenticated видеть ход выполнения запущенной им задачи архивации.
+    """
+    model = ArchiveTask
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchiveTaskSerializer
+
+    def get_queryset(self):
+        return ArchiveTask.objects.filter(user=self.request.user)
+
+
+# Асинхронные варианты чтения для ASGI-сервера (goals/async/...): те же фильтры, права и формат ответа, что у
+# синхронных view, модель выполнения описана в AsyncViewMixin.
+class GoalCategoryListAsyncView(AsyncViewMixin, GoalCategoryListView):
+    pass
+
+
+class GoalCategoryAsyncView(AsyncViewMixin, GoalCategoryView):
+    pass
+
+
+class GoalListAsyncView(AsyncViewMixin, GoalListView):
+    pass
+
+
+class GoalAsyncView(AsyncViewMixin, GoalView):
+    pass
+
+
+class GoalCommentListAsyncView(AsyncViewMixin, GoalCommentListView):
+    pass
+
+
+class GoalCommentAsyncView(AsyncViewMixin, GoalCommentView):
+    pass
+
+
+class BoardListAsyncView(AsyncViewMixin, BoardListView):
+    pass
+
+
+class BoardAsyncView(AsyncViewMixin, BoardView):
+    pass
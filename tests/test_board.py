@@ -1,12 +1,20 @@
+import asyncio
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from core.models import User
-from goals.models import Board, BoardParticipant
+from goals.events import get_broker
+from goals.models import ArchiveTask, Board, BoardParticipant, GoalCategory, Goal, GoalCounter
+from tests.utils import QueryBudgetMixin
 
 
-class BoardTest(APITestCase):
+class BoardTest(QueryBudgetMixin, APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="Dianerys", email="dian@mail.ru", password="Dian_password")
         self.client.force_login(self.user)
@@ -55,6 +63,23 @@ class BoardTest(APITestCase):
         board_obj = Board.objects.get(pk=response.data["id"])
         self.assertEqual(board_obj.title, res.data["title"])
 
+    def test_board_get_detail_not_modified(self):
+        url = reverse("board-create")
+        response = self.client.post(url, {"title": "board_new_title"}, format='json')
+
+        url_detailed = reverse("board-detail", kwargs={"pk": response.data["id"]})
+        res = self.client.get(url_detailed, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res_etag = self.client.get(url_detailed, format='json', HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        res_date = self.client.get(url_detailed, format='json', HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url_detailed, {"title": "board_updated_title"}, format='json')
+        res_etag = self.client.get(url_detailed, format='json', HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res_etag.status_code, status.HTTP_200_OK)
+
     def test_board_update(self):
         url = reverse("board-create")
         data = {"title": "board_new_title"}
@@ -70,6 +95,40 @@ class BoardTest(APITestCase):
         board_obj = Board.objects.get(pk=response.data["id"])
         self.assertEqual(board_obj.title, res.data["title"])
 
+    def test_board_update_participants(self):
+        board = Board.objects.create(title="Board_participants")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        kept, changed, removed, added = (
+            User.objects.create_user(username=name, password="Some_password")
+            for name in ("kept", "changed", "removed", "added")
+        )
+        kept_participant = BoardParticipant.objects.create(user=kept, board=board, role=BoardParticipant.Role.reader)
+        BoardParticipant.objects.create(user=changed, board=board, role=BoardParticipant.Role.reader)
+        BoardParticipant.objects.create(user=removed, board=board, role=BoardParticipant.Role.reader)
+
+        url = reverse("board-detail", kwargs={"pk": board.pk})
+        data = {"title": board.title, "participants": [
+            {"user": kept.username, "role": BoardParticipant.Role.reader},
+            {"user": changed.username, "role": BoardParticipant.Role.writer},
+            {"user": added.username, "role": BoardParticipant.Role.reader},
+        ]}
+        response = self.client.put(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        roles = dict(BoardParticipant.objects.filter(board=board).values_list("user__username", "role"))
+        self.assertEqual(roles, {
+            self.user.username: BoardParticipant.Role.owner,
+            kept.username: BoardParticipant.Role.reader,
+            changed.username: BoardParticipant.Role.writer,
+            added.username: BoardParticipant.Role.reader,
+        })
+        # неизмененный участник не пересоздается
+        self.assertTrue(BoardParticipant.objects.filter(pk=kept_participant.pk).exists())
+
+        data["participants"].append({"user": "unknown", "role": BoardParticipant.Role.reader})
+        response = self.client.put(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_board_delete(self):
         url = reverse("board-create")
         data = {"title": "board_new_title"}
@@ -81,3 +140,157 @@ class BoardTest(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         # Доска остается в БД (согласно требованиям ТЗ)
         self.assertEqual(Board.objects.filter(title=data["title"]).count(), 1)
+
+    def test_board_delete_archives_goals_in_background(self):
+        board = Board.objects.create(title="Board_archive")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title="category_archive", board=board, user=self.user)
+        goals = [Goal.objects.create(title=f"goal_{index}", category=category, user=self.user) for index in range(3)]
+
+        res = self.client.delete(reverse("board-detail", kwargs={"pk": board.pk}), format='json')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        # цели скрываются сразу, хотя еще не архивированы
+        response = self.client.get(reverse("goal-list"), format='json')
+        self.assertEqual(response.data, [])
+        self.assertFalse(Goal.objects.filter(board=board, status=Goal.Status.archived).exists())
+
+        task = ArchiveTask.objects.get(board=board)
+        response = self.client.get(reverse("archivetask-detail", kwargs={"pk": task.pk}), format='json')
+        self.assertEqual(response.data["status"], ArchiveTask.Status.pending)
+
+        call_command("runarchiver", "--once", "--batch-size", "2")
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.total, task.processed), (ArchiveTask.Status.done, len(goals), len(goals)))
+        self.assertEqual(Goal.objects.filter(board=board, status=Goal.Status.archived).count(), len(goals))
+
+    def test_board_progress(self):
+        board = Board.objects.create(title="Board_progress")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title="category_progress", board=board, user=self.user)
+        goal = Goal.objects.create(title="goal_progress", category=category, user=self.user)
+        Goal.objects.create(title="goal_to_do", category=category, user=self.user)
+
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        call_command("snapshotprogress", "--date", yesterday.isoformat())
+        goal.status = Goal.Status.done
+        goal.save()
+        call_command("snapshotprogress")
+        call_command("snapshotprogress")
+
+        # записанная история не перезаписывается текущими счетчиками
+        for snapshot_date in (yesterday, today - timedelta(days=2), today + timedelta(days=1)):
+            with self.assertRaises(CommandError):
+                call_command("snapshotprogress", "--date", snapshot_date.isoformat())
+
+        url = reverse("board-progress", kwargs={"pk": board.pk})
+        response = self.client.get(url, {"date__gte": yesterday.isoformat()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(item["date"], item["status"], item["count"]) for item in response.data], [
+            (yesterday.isoformat(), Goal.Status.to_do, 2),
+            (today.isoformat(), Goal.Status.to_do, 1),
+            (today.isoformat(), Goal.Status.done, 1),
+        ])
+
+        foreign_board = Board.objects.create(title="Board_foreign")
+        response = self.client.get(reverse("board-progress", kwargs={"pk": foreign_board.pk}), format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_board_snapshot(self):
+        board = Board.objects.create(title="Board_snapshot")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title="category_snapshot", board=board, user=self.user)
+        category_deleted = GoalCategory.objects.create(title="category_deleted", board=board, user=self.user)
+        # цель удаленной категории еще не архивирована фоновой задачей, но в снимок не попадает
+        Goal.objects.create(title="goal_of_deleted_category", category=category_deleted, user=self.user)
+        self.client.delete(reverse("category-detail", kwargs={"pk": category_deleted.pk}), format='json')
+        goal_to_do = Goal.objects.create(title="goal_to_do", category=category, user=self.user)
+        goal_done = Goal.objects.create(title="goal_done", category=category, user=self.user, status=Goal.Status.done)
+        Goal.objects.create(title="goal_archived", category=category, user=self.user, status=Goal.Status.archived)
+
+        url = reverse("board-snapshot", kwargs={"pk": board.pk})
+        # сессия, пользователь, доска, роли пользователя и четыре запроса предзагрузки (со счетчиками целей)
+        with self.assertQueryBudget(8):
+            response = self.client.get(url, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["user"] for item in response.data["participants"]], [self.user.username])
+        self.assertEqual([item["id"] for item in response.data["categories"]], [category.pk])
+
+        columns = {column["status"]: [goal["id"] for goal in column["goals"]] for column in response.data["columns"]}
+        self.assertEqual(columns, {
+            Goal.Status.to_do: [goal_to_do.pk],
+            Goal.Status.in_progress: [],
+            Goal.Status.done: [goal_done.pk],
+        })
+
+    def test_board_import(self):
+        board = Board.objects.create(title="Board_import")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title="existing", board=board, user=self.user)
+
+        content = "\n".join([
+            "title,category_title,status,priority,due_date",
+            "goal_one,existing,2,3,2020-01-01T00:00:00Z",
+            "goal_two,imported,,,",
+            ",imported,,,",
+            "goal_three,imported,7,,",
+        ])
+        url = reverse("board-import", kwargs={"pk": board.pk})
+        response = self.client.post(url, {"file": SimpleUploadedFile("goals.csv", content.encode())},
+                                    format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["created"], response.data["categories_created"]), (2, 1))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4])
+
+        goals = dict(Goal.objects.filter(board=board).values_list("title", "category__title"))
+        self.assertEqual(goals, {"goal_one": category.title, "goal_two": "imported"})
+        self.assertEqual(sum(GoalCounter.objects.filter(board=board, category=None).values_list("count", flat=True)), 2)
+
+        # файл не в UTF-8 не обрывает запрос ошибкой сервера, а возвращает ошибку строки
+        content = "title,category_title\nцель,категория\n".encode("cp1251")
+        response = self.client.post(url, {"file": SimpleUploadedFile("goals_cp1251.csv", content)}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [1])
+        self.assertEqual(Goal.objects.filter(board=board).count(), 2)
+
+        # строки NDJSON, которые не являются объектами, попадают в ошибки, остальные загружаются
+        content = '{"title": "goal_ndjson", "category": "imported"}\n{"title": \n[1, 2]\n'.encode()
+        response = self.client.post(url, {"file": SimpleUploadedFile("goals.ndjson", content)}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertEqual(Goal.objects.filter(board=board).count(), 3)
+
+    def test_board_events(self):
+        board = Board.objects.create(title="Board_events")
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title="category_events", board=board, user=self.user)
+
+        broker = get_broker()
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def subscribe():
+            return broker.subscribe(board.pk)
+        subscription = loop.run_until_complete(subscribe())
+        self.addCleanup(broker.unsubscribe, subscription)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            goal = Goal.objects.create(title="goal_events", category=category, user=self.user)
+        event = loop.run_until_complete(asyncio.wait_for(subscription.get(), timeout=1))
+        self.assertEqual(event, {"board_id": board.pk, "entity": "goal", "object_id": goal.pk, "action": "created"})
+
+        # события другой доски подписчику не приходят, при переполнении вместо событий приходит resync
+        broker.publish([{"board_id": board.pk + 1, "entity": "goal", "object_id": goal.pk, "action": "updated"}])
+        broker.publish([{"board_id": board.pk, "entity": "goal", "object_id": goal.pk, "action": "updated"}]
+                       * (broker.max_events_per_board + 1))
+        event = loop.run_until_complete(asyncio.wait_for(subscription.get(), timeout=1))
+        self.assertEqual(event["action"], "resync")
+        self.assertTrue(subscription.queue.empty())
@@ -0,0 +1,296 @@
+import asyncio
+import io
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from bot.engine import BotEngine
+from bot.handlers import MessageHandler
+from bot.models import ChatState, TgUser
+from bot.states import ChatStateStore, StaleChatState
+from bot.tg.client import TgClient, TgClientError
+from bot.tg.fake_server import FakeTelegramServer
+from bot.tg.outbox import MESSAGE_LIMIT, Outbox, pack_lines
+from bot.webhook import SECRET_HEADER, WebhookDispatcher
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+
+def make_update(update_id: int, chat_id: int, text: str, username: str | None = None) -> dict:
+    chat = {"id": chat_id, "username": username} if username else {"id": chat_id}
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": chat, "text": text}}
+
+
+class BotEngineTest(SimpleTestCase):
+    def test_engine_handles_chats_in_parallel(self):
+        handled: dict[int, list[str]] = {}
+        lock = threading.Lock()
+
+        def handle(message):
+            time.sleep(0.05)
+            with lock:
+                handled.setdefault(message["chat"]["id"], []).append(message["text"])
+
+        engine = BotEngine(handle, workers=32)
+        self.addCleanup(engine.executor.shutdown)
+
+        async def burst():
+            # 1000 пользователей присылают по два сообщения почти одновременно
+            for update_id in range(2000):
+                engine.dispatch(make_update(update_id, chat_id=update_id % 1000, text=str(update_id // 1000)))
+            await engine.join()
+
+        started = time.perf_counter()
+        asyncio.run(burst())
+        elapsed = time.perf_counter() - started
+
+        # последовательная обработка заняла бы 100 секунд
+        self.assertLess(elapsed, 15)
+        self.assertEqual(len(handled), 1000)
+        self.assertTrue(all(texts == ["0", "1"] for texts in handled.values()))
+
+
+class TgClientTest(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeTelegramServer().start()
+        self.addCleanup(self.server.stop)
+        self.client = TgClient(token="test", base_url=self.server.url, backoff=0.01)
+
+    def test_client_get_updates(self):
+        update = self.server.add_update(chat_id=1, text="/goals")
+
+        response = self.client.get_updates(offset=0, timeout=0)
+        self.assertEqual(response.result, [update])
+        response = self.client.get_updates(offset=update["update_id"] + 1, timeout=0)
+        self.assertEqual(response.result, [])
+
+    def test_client_retries(self):
+        self.server.fail(500, times=2)
+        self.client.get_send_message(chat_id=1, text="hello")
+        self.assertEqual((self.server.requests, len(self.server.sent)), (3, 1))
+
+        # при 429 клиент ждет retry_after секунд из ответа
+        self.server.fail(429, "Too Many Requests: retry after 1", retry_after=1)
+        started = time.perf_counter()
+        self.client.get_send_message(chat_id=1, text="hello")
+        self.assertGreaterEqual(time.perf_counter() - started, 1)
+
+        # ошибки запроса не повторяются, временные ошибки повторяются ограниченное число раз
+        self.server.fail(400, "Bad Request: chat not found")
+        with self.assertRaises(TgClientError) as error:
+            self.client.get_send_message(chat_id=1, text="hello")
+        self.assertEqual(error.exception.error_code, 400)
+
+        requests = self.server.requests
+        self.server.fail(502, times=self.client.retries + 1)
+        with self.assertRaises(TgClientError):
+            self.client.get_send_message(chat_id=1, text="hello")
+        self.assertEqual(self.server.requests - requests, self.client.retries + 1)
+
+    def test_client_retries_timeouts(self):
+        # ответ не успевает прийти: sendMessage не повторяется, чтобы сообщение не ушло дважды, а getUpdates повторяется
+        self.server.latency = 0.2
+        with self.assertRaises(TgClientError):
+            self.client.call("sendMessage", request_timeout=0.05, chat_id=1, text="hello")
+        time.sleep(0.3)
+        self.assertEqual((self.server.requests, len(self.server.sent)), (1, 1))
+
+        with self.assertRaises(TgClientError):
+            self.client.call("getUpdates", request_timeout=0.05, offset=0, timeout=0)
+        time.sleep(0.3)
+        self.assertEqual(self.server.requests, 1 + self.client.retries + 1)
+
+
+class OutboxTest(SimpleTestCase):
+    def test_pack_lines(self):
+        lines = [f"goal_{index:03}" for index in range(300)]
+        messages = pack_lines(lines)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].split("\n"), lines)
+
+        messages = pack_lines(["a" * 3000, "b" * 3000, "c" * 5000])
+        self.assertEqual([len(message) for message in messages], [3000, 3000, MESSAGE_LIMIT, 5000 - MESSAGE_LIMIT])
+        self.assertTrue(all(len(message) <= MESSAGE_LIMIT for message in pack_lines(["x" * 100] * 500)))
+
+    def test_outbox(self):
+        with FakeTelegramServer() as server:
+            outbox = Outbox(TgClient(token="test", base_url=server.url), global_rate=50, chat_rate=5, chat_burst=1,
+                            senders=4).start()
+            with outbox.batch():
+                for index in range(300):
+                    outbox.send(chat_id=1, text=f"goal_{index}")
+                outbox.send(chat_id=2, text="hello")
+            for index in range(5):
+                outbox.send(chat_id=3, text=f"message_{index}")
+
+            started = time.perf_counter()
+            self.assertTrue(outbox.flush(timeout=10))
+            elapsed = time.perf_counter() - started
+
+        # 300 строк ушли одним сообщением, сообщения чата 3 - по порядку и не чаще 5 в секунду
+        texts = {}
+        for message in server.sent:
+            texts.setdefault(message["chat"]["id"], []).append(message["text"])
+        self.assertEqual(len(texts[1]), 1)
+        self.assertEqual(texts[3], [f"message_{index}" for index in range(5)])
+        self.assertGreaterEqual(elapsed, 0.7)
+
+        metrics = outbox.metrics()
+        self.assertEqual((metrics["queue_depth"], metrics["sent"], metrics["failed"]), (0, 7, 0))
+        self.assertIn("latency_p95", metrics)
+
+
+class ChatStateStoreTest(TestCase):
+    def test_chat_state_store(self):
+        store = ChatStateStore(ttl=60)
+        chat_state = store.get(1)
+        self.assertEqual((chat_state.state, chat_state.pk), (ChatState.State.idle, None))
+
+        chat_state.state = ChatState.State.awaiting_category
+        store.save(chat_state)
+        self.assertEqual(ChatState.objects.get(tg_chat_id=1).version, 1)
+
+        # другой процесс видит сохраненное состояние, у каждого чата оно свое
+        other_store = ChatStateStore(ttl=60)
+        self.assertEqual(other_store.get(1).state, ChatState.State.awaiting_category)
+        self.assertEqual(other_store.get(2).state, ChatState.State.idle)
+
+        # состояние активного чата берется из кэша, из БД читается только версия
+        with self.assertNumQueries(1):
+            chat_state = store.get(1)
+
+        # сохранение поверх изменений другого процесса отклоняется
+        other_state = other_store.get(1)
+        other_state.state = ChatState.State.awaiting_goal_title
+        other_state.data = {"category_id": 10}
+        other_store.save(other_state)
+        chat_state.state = ChatState.State.idle
+        with self.assertRaises(StaleChatState):
+            store.save(chat_state)
+        self.assertEqual(store.get(1).data, {"category_id": 10})
+
+        # истекшее состояние считается начальным
+        ChatState.objects.filter(tg_chat_id=1).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(ChatStateStore(ttl=60).get(1).state, ChatState.State.idle)
+
+
+class WebhookTest(SimpleTestCase):
+    def test_webhook_dispatcher(self):
+        handled: list[str] = []
+        release = threading.Event()
+
+        def handle(message):
+            release.wait(5)
+            handled.append(message["text"])
+
+        dispatcher = WebhookDispatcher(handle, workers=4, queue_size=2).start()
+
+        # обновление без сообщения не занимает место в очереди
+        self.assertTrue(dispatcher.submit({"update_id": 0}))
+        dispatcher.join(timeout=5)
+
+        # пока обработчик занят, в очередь помещается не больше queue_size обновлений
+        self.assertTrue(dispatcher.submit(make_update(1, chat_id=1, text="a")))
+        self.assertTrue(dispatcher.submit(make_update(2, chat_id=2, text="b")))
+        self.assertFalse(dispatcher.submit(make_update(3, chat_id=3, text="c")))
+
+        release.set()
+        dispatcher.join(timeout=5)
+        self.assertEqual(sorted(handled), ["a", "b"])
+        self.assertTrue(dispatcher.submit(make_update(4, chat_id=3, text="c")))
+        dispatcher.join(timeout=5)
+        self.assertEqual(handled[-1], "c")
+
+    @override_settings(BOT_DELIVERY_MODE="webhook", BOT_WEBHOOK_SECRET="secret")
+    def test_webhook_view(self):
+        url = reverse("bot-webhook")
+        update = make_update(1, chat_id=1, text="/goals")
+        response = self.client.post(url, update, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        headers = {f"HTTP_{SECRET_HEADER.upper().replace('-', '_')}": "wrong"}
+        response = self.client.post(url, update, content_type="application/json", **headers)
+        self.assertEqual(response.status_code, 403)
+
+        headers = {f"HTTP_{SECRET_HEADER.upper().replace('-', '_')}": "secret"}
+        response = self.client.post(url, {"text": "/goals"}, content_type="application/json", **headers)
+        self.assertEqual(response.status_code, 400)
+
+        with self.settings(BOT_DELIVERY_MODE="polling"):
+            response = self.client.post(url, update, content_type="application/json", **headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_runbot_sets_webhook(self):
+        with FakeTelegramServer() as server, self.settings(BOT_DELIVERY_MODE="webhook", BOT_API_URL=server.url,
+                                                           BOT_WEBHOOK_URL="https://example.com/api/bot/webhook",
+                                                           BOT_WEBHOOK_SECRET="secret"):
+            call_command("runbot", stdout=io.StringIO())
+            self.assertEqual(server.webhook["secret_token"], "secret")
+
+            # пока webhook задан, long polling невозможен
+            with self.assertRaises(TgClientError) as error:
+                TgClient(token="test", base_url=server.url).get_updates(timeout=0)
+            self.assertEqual(error.exception.error_code, 409)
+
+
+class BotDialogMixin:
+    def setUp(self):
+        user = User.objects.create_user(username="Tyrion", password="Tyrion_password")
+        board = Board.objects.create(title="Board_Bot")
+        BoardParticipant.objects.create(board=board, user=user)
+        self.category = GoalCategory.objects.create(title="category_Bot", board=board, user=user)
+        TgUser.objects.create(tg_chat_id=5, tg_username="tyrion", user=user)
+
+    def make_handler(self) -> MessageHandler:
+        # очередь ответов не запущена, отправленные ответы остаются в outbox.pending
+        return MessageHandler(Outbox(TgClient(token="test", base_url="http://127.0.0.1:9")), ChatStateStore())
+
+    def send(self, handler: MessageHandler, text: str) -> None:
+        handler.handle_message(make_update(0, chat_id=5, text=text, username="tyrion")["message"])
+
+
+
+class MessageHandlerTest(BotDialogMixin, TestCase):
+    def test_handler_reads_state_saved_by_other_process(self):
+        first, second = self.make_handler(), self.make_handler()
+        self.send(first, "/create")
+        self.assertEqual(first.states.get(5).state, ChatState.State.awaiting_category)
+
+        # другой процесс продвинул диалог, кэш первого процесса устарел
+        self.send(second, str(self.category.pk))
+        self.assertEqual(first.states.get(5).state, ChatState.State.awaiting_goal_title)
+
+        self.send(first, "goal_from_bot")
+        self.assertTrue(Goal.objects.filter(title="goal_from_bot", category=self.category).exists())
+        self.assertEqual(second.states.get(5).state, ChatState.State.idle)
+
+    def test_updates_of_one_chat_on_two_workers(self):
+        # обновления одного чата по очереди доставляются в два процесса веб-приложения
+        workers = [self.make_handler(), self.make_handler()]
+        for index, text in enumerate(["/create", str(self.category.pk), "goal_from_webhook", "/create"]):
+            self.send(workers[index % 2], text)
+
+        self.assertEqual(Goal.objects.filter(title="goal_from_webhook").count(), 1)
+        self.assertEqual(ChatState.objects.get(tg_chat_id=5).state, ChatState.State.awaiting_category)
+        replies = "\n".join(text for worker in workers for text, _ in worker.outbox.pending[5])
+        self.assertNotIn("Неизвестная команда", replies)
+        self.assertNotIn("Ошибка. Введите корректную категорию.", replies)
+
+
+class WebhookDialogTest(BotDialogMixin, TransactionTestCase):
+    def test_webhook_updates_of_one_chat_on_two_processes(self):
+        # два процесса веб-приложения со своими очередями и кэшами состояний принимают обновления одного чата
+        handlers = [self.make_handler(), self.make_handler()]
+        dispatchers = [WebhookDispatcher(handler.handle_message, workers=2).start() for handler in handlers]
+        for index, text in enumerate(["/create", str(self.category.pk), "goal_from_webhook"]):
+            dispatcher = dispatchers[index % 2]
+            self.assertTrue(dispatcher.submit(make_update(index, chat_id=5, text=text, username="tyrion")))
+            dispatcher.join(timeout=5)
+
+        self.assertEqual(Goal.objects.filter(title="goal_from_webhook", category=self.category).count(), 1)
+        self.assertEqual(ChatState.objects.get(tg_chat_id=5).state, ChatState.State.idle)
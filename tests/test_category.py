@@ -1,9 +1,11 @@
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from core.models import User
-from goals.models import GoalCategory, Board
+from goals.models import GoalCategory, Board, BoardParticipant, Goal
 
 
 class HelpfulTest(APITestCase):
@@ -127,6 +129,7 @@ class GoalCategoryTest(HelpfulTest):
 
     def test_category_delete_for_db_category(self):
         category = self.create_category_in_db()
+        Goal.objects.create(title="goal_of_deleted_category", category=category, user=self.user)
 
         url_detailed = reverse("category-detail", kwargs={"pk": category.pk})
         res = self.client.delete(url_detailed, format='json')
@@ -134,3 +137,30 @@ class GoalCategoryTest(HelpfulTest):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         # Категория остается в БД (согласно требованиям ТЗ)
         self.assertEqual(GoalCategory.objects.filter(pk=category.pk).count(), 1)
+
+        # цели удаленной категории скрываются до архивации без соединения с таблицей категорий
+        self.assertEqual(self.client.get(reverse("goal-list"), format='json').data, [])
+        self.assertNotIn("JOIN", str(Goal.objects.visible_to(self.user).query))
+
+    @override_settings(BOARD_ROLES_CACHE_TIMEOUT=60)
+    def test_category_update_after_role_change(self):
+        self.addCleanup(cache.clear)
+        owner = User.objects.create_user(username="Owner", password="Owner_password")
+        board = Board.objects.create(title="Board_shared")
+        BoardParticipant.objects.create(user=owner, board=board, role=BoardParticipant.Role.owner)
+        participant = BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.writer)
+        category = GoalCategory.objects.create(title="category_shared", board=board, user=owner)
+
+        url_detailed = reverse("category-detail", kwargs={"pk": category.pk})
+        res = self.client.patch(url_detailed, {"title": "category_writer_title"}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # роли пользователя закэшированы, изменение роли должно сбросить кэш
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.role = BoardParticipant.Role.reader
+            participant.save()
+
+        res = self.client.patch(url_detailed, {"title": "category_reader_title"}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(url_detailed, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
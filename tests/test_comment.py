@@ -1,9 +1,12 @@
+import json
+from base64 import urlsafe_b64encode
+
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from core.models import User
-from goals.models import Board, GoalComment, Goal, GoalCategory
+from goals.models import Board, BoardParticipant, GoalComment, Goal, GoalCategory
 
 
 class HelpfulTest(APITestCase):
@@ -108,3 +111,32 @@ class CommentTest(HelpfulTest):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         # Комментарий удаляется из БД (согласно требованиям ТЗ)
         self.assertEqual(GoalComment.objects.filter(pk=response_comment.data["id"]).count(), 0)
+
+    def test_comment_get_list_with_cursor(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        comments = [GoalComment.objects.create(text=f"comment_{i}", goal=self.goal, user=self.user) for i in range(5)]
+
+        url = reverse("comment-list")
+        response = self.client.get(url, {"cursor": "", "limit": 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+
+        received = [item["id"] for item in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"], format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            received.extend(item["id"] for item in response.data["results"])
+
+        self.assertEqual(received, [comment.pk for comment in reversed(comments)])
+
+        response = self.client.get(response.data["previous"], format='json')
+        self.assertEqual([item["id"] for item in response.data["results"]], received[2:4])
+
+        # курсор с подмененными значениями или от другой сортировки отклоняется, а не приводит к ошибке сервера
+        for position in (["x", 1], [{"a": 1}, 1], [1, "x"]):
+            cursor = urlsafe_b64encode(json.dumps({"p": position, "r": 0}).encode()).decode()
+            response = self.client.get(url, {"cursor": cursor}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {"cursor": cursor, "ordering": "text"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,9 +1,18 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
 from core.models import User
-from goals.models import Board, GoalCategory, Goal
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+from goals.serializers import GoalCategorySerializer, GoalCommentSerializer, GoalSerializer
 
 
 class HelpfulTest(APITestCase):
@@ -70,6 +79,23 @@ class GoalTest(HelpfulTest):
         goal_obj = Goal.objects.get(pk=response_goal.data["id"])
         self.assertEqual(goal_obj.title, res.data["title"])
 
+    @override_settings(ASYNC_VIEWS_THREADS=0)
+    def test_goal_async_views(self):
+        response_cat = self.create_category()
+        response_goal = self.client.post(reverse("goal-create"), {"title": "test_goal",
+                                                                  "category": response_cat.data["id"]}, format='json')
+        pk = response_goal.data["id"]
+
+        for name, kwargs in (("goal-list", {}), ("goal-detail", {"pk": pk}), ("category-list", {}),
+                             ("board-list", {})):
+            response = self.client.get(reverse(f"{name}-async", kwargs=kwargs), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, self.client.get(reverse(name, kwargs=kwargs), format='json').data)
+
+        # асинхронные варианты только для чтения
+        response = self.client.delete(reverse("goal-detail-async", kwargs={"pk": pk}), format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
     def test_goal_update(self):
         response_cat = self.create_category()
 
@@ -123,3 +149,176 @@ class GoalTest(HelpfulTest):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         # Цель остается в БД (согласно требованиям ТЗ)
         self.assertEqual(Goal.objects.filter(pk=response_goal.data["id"]).count(), 1)
+
+    def test_goal_board_follows_category(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        comment = GoalComment.objects.create(text="comment_zero", goal=self.goal, user=self.user)
+        self.assertEqual(self.goal.board_id, self.board.pk)
+        self.assertEqual(comment.board_id, self.board.pk)
+
+        response_cat = self.create_category()
+        url_detailed = reverse("goal-detail", kwargs={"pk": self.goal.pk})
+        res = self.client.patch(url_detailed, {"category": response_cat.data["id"]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        new_board_id = GoalCategory.objects.get(pk=response_cat.data["id"]).board_id
+        self.assertEqual(Goal.objects.get(pk=self.goal.pk).board_id, new_board_id)
+        self.assertEqual(GoalComment.objects.get(pk=comment.pk).board_id, new_board_id)
+        self.assertEqual(res.data["board"], new_board_id)
+
+    def test_goal_full_text_search(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        goal_found = Goal.objects.create(title="Купить молоко", description="В магазине у дома",
+                                         category=self.category, user=self.user)
+        Goal.objects.create(title="Прочитать книгу", category=self.category, user=self.user)
+
+        url = reverse("goal-list")
+        response = self.client.get(url, {"search": "магаз"}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data], [goal_found.pk])
+
+    def test_goal_list_not_modified(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+
+        url = reverse("goal-list")
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Goal.objects.create(title="goal_new", category=self.category, user=self.user)
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_goal_bulk_update(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        other_board = Board.objects.create(title="Board_Delta")
+        BoardParticipant.objects.create(user=self.user, board=other_board, role=BoardParticipant.Role.writer)
+        other_category = GoalCategory.objects.create(title="category_Delta", board=other_board, user=self.user)
+        second_goal = Goal.objects.create(title="goal_One", category=self.category, user=self.user)
+        comment = GoalComment.objects.create(text="comment", goal=second_goal, user=self.user)
+        foreign_category = GoalCategory.objects.create(title="category_Foreign", user=self.user,
+                                                       board=Board.objects.create(title="Board_Foreign"))
+        foreign_goal = Goal.objects.create(title="goal_Foreign", category=foreign_category, user=self.user)
+
+        url = reverse("goal-bulk-update")
+        data = [
+            {"id": self.goal.pk, "status": Goal.Status.in_progress},
+            {"id": second_goal.pk, "category": other_category.pk, "priority": Goal.Priority.high},
+            {"id": foreign_goal.pk, "status": Goal.Status.done},
+            {"id": self.goal.pk, "status": "unknown"},
+        ]
+        response = self.client.patch(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], sorted([self.goal.pk, second_goal.pk]))
+        self.assertEqual(sorted(response.data["errors"]), [2, 3])
+
+        self.goal.refresh_from_db()
+        second_goal.refresh_from_db()
+        comment.refresh_from_db()
+        foreign_goal.refresh_from_db()
+        self.assertEqual(self.goal.status, Goal.Status.in_progress)
+        self.assertEqual(second_goal.priority, Goal.Priority.high)
+        self.assertEqual(second_goal.board_id, other_board.pk)
+        self.assertEqual(comment.board_id, other_board.pk)
+        self.assertEqual(foreign_goal.status, Goal.Status.to_do)
+
+    def test_goal_counters(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        goal = Goal.objects.create(title="goal_One", category=self.category, user=self.user,
+                                   priority=Goal.Priority.high)
+
+        url_detailed = reverse("goal-detail", kwargs={"pk": goal.pk})
+        res = self.client.patch(url_detailed, {"status": Goal.Status.done}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        expected = [
+            {"status": Goal.Status.to_do, "priority": Goal.Priority.medium, "count": 1},
+            {"status": Goal.Status.done, "priority": Goal.Priority.high, "count": 1},
+        ]
+        response = self.client.get(reverse("category-detail", kwargs={"pk": self.category.pk}), format='json')
+        self.assertCountEqual(response.data["goal_counts"], expected)
+
+        response = self.client.get(reverse("board-list"), format='json')
+        self.assertCountEqual(response.data[0]["goal_counts"], expected)
+
+    def test_goal_list_matches_model_serializer(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        goal = Goal.objects.create(title="goal_One", category=self.category, user=self.user, description="text",
+                                   due_date=timezone.now() + timedelta(days=1))
+        GoalComment.objects.create(text="comment", goal=goal, user=self.user)
+
+        cases = [
+            ("goal-list", GoalSerializer(Goal.objects.order_by("title"), many=True)),
+            ("category-list", GoalCategorySerializer(GoalCategory.objects.order_by("title"), many=True)),
+            ("comment-list", GoalCommentSerializer(GoalComment.objects.order_by("-created"), many=True)),
+        ]
+        for url_name, serializer in cases:
+            response = self.client.get(reverse(url_name), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json(), json.loads(JSONRenderer().render(serializer.data)))
+
+    def test_goal_export(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        GoalComment.objects.create(text="comment", goal=self.goal, user=self.user)
+
+        url = reverse("goal-export")
+        response = self.client.get(url, {"output": "ndjson", "comments": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        records = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(record["type"], record["id"]) for record in records],
+                         [("category", self.category.pk), ("goal", self.goal.pk)])
+        self.assertEqual([comment["text"] for comment in records[1]["comments"]], ["comment"])
+
+        response = self.client.get(url, {"output": "csv", "board": self.board.pk}, HTTP_ACCEPT="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([(row["title"], row["category_title"], row["user"]) for row in rows],
+                         [(self.goal.title, self.category.title, self.user.username)])
+
+    def test_goal_changes(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        url = reverse("changes")
+
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["full_sync_required"])
+        cursor = response.data["cursor"]
+
+        goal = Goal.objects.create(title="goal_changed", category=self.category, user=self.user)
+        response = self.client.get(url, {"since": cursor}, format='json')
+        self.assertFalse(response.data["full_sync_required"])
+        self.assertIn(goal.pk, [item["id"] for item in response.data["goals"]])
+
+        self.client.delete(reverse("goal-detail", kwargs={"pk": goal.pk}), format='json')
+        response = self.client.get(url, {"since": cursor}, format='json')
+        self.assertIn({"entity": "goal", "id": goal.pk}, response.data["deleted"])
+
+    def test_goal_changes_after_removal_and_prune(self):
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        reader = User.objects.create_user(username="Jorah", password="Jorah_password")
+        BoardParticipant.objects.create(user=reader, board=self.board, role=BoardParticipant.Role.reader)
+        url = reverse("changes")
+
+        self.client.force_login(reader)
+        cursor = self.client.get(url, format='json').data["cursor"]
+
+        # исключенный из доски участник получает удаление доски
+        self.client.force_login(self.user)
+        response = self.client.patch(reverse("board-detail", kwargs={"pk": self.board.pk}),
+                                     {"participants": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_login(reader)
+        response = self.client.get(url, {"since": cursor}, format='json')
+        self.assertFalse(response.data["full_sync_required"])
+        self.assertEqual(response.data["deleted"], [{"entity": "board", "id": self.board.pk}])
+
+        # после очистки журнала курсор старше очищенной части требует полной синхронизации
+        call_command("prunechanges", days=0)
+        response = self.client.get(url, {"since": cursor}, format='json')
+        self.assertTrue(response.data["full_sync_required"])
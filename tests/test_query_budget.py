@@ -0,0 +1,64 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import User
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+from tests.utils import QueryBudgetMixin
+
+# сессия, пользователь, основной запрос и проверка участия в доске для детальных эндпоинтов;
+# условные GET (ETag) добавляют запрос к версиям досок, счетчики целей досок и категорий - запрос предзагрузки
+LIST_BUDGET = 3
+CONDITIONAL_LIST_BUDGET = 4
+DETAIL_BUDGET = 4
+BOARD_DETAIL_BUDGET = 6
+GOAL_COUNTERS_BUDGET = 1
+
+
+class QueryBudgetTest(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="Dianerys", email="dian@mail.ru", password="Dian_password")
+        self.client.force_login(self.user)
+        self.board = Board.objects.create(title="Board_Gamma")
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        self.category = GoalCategory.objects.create(title="category_Gamma", board=self.board, user=self.user)
+        self.goal = Goal.objects.create(title="goal_Zero", category=self.category, user=self.user)
+
+    def fill_board(self, size: int):
+        for number in range(size):
+            author = User.objects.create_user(username=f"author_{number}", password="Author_password")
+            BoardParticipant.objects.create(user=author, board=self.board, role=BoardParticipant.Role.writer)
+            category = GoalCategory.objects.create(title=f"category_{number}", board=self.board, user=author)
+            goal = Goal.objects.create(title=f"goal_{number}", category=category, user=author)
+            GoalComment.objects.create(text=f"comment_{number}", goal=goal, user=author)
+
+    def assertEndpointBudget(self, url: str, budget: int):
+        # бюджет должен выдерживаться одинаково для одной строки и для страницы из нескольких строк
+        for extra_rows in (0, 10):
+            self.fill_board(extra_rows)
+            with self.assertQueryBudget(budget):
+                response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_goal_list_budget(self):
+        self.assertEndpointBudget(reverse("goal-list"), CONDITIONAL_LIST_BUDGET)
+
+    def test_category_list_budget(self):
+        self.assertEndpointBudget(reverse("category-list"), CONDITIONAL_LIST_BUDGET + GOAL_COUNTERS_BUDGET)
+
+    def test_comment_list_budget(self):
+        GoalComment.objects.create(text="comment_zero", goal=self.goal, user=self.user)
+        self.assertEndpointBudget(reverse("comment-list"), LIST_BUDGET)
+
+    def test_board_list_budget(self):
+        self.assertEndpointBudget(reverse("board-list"), LIST_BUDGET + GOAL_COUNTERS_BUDGET)
+
+    def test_goal_detail_budget(self):
+        self.assertEndpointBudget(reverse("goal-detail", kwargs={"pk": self.goal.pk}), DETAIL_BUDGET)
+
+    def test_category_detail_budget(self):
+        self.assertEndpointBudget(reverse("category-detail", kwargs={"pk": self.category.pk}),
+                                  DETAIL_BUDGET + GOAL_COUNTERS_BUDGET)
+
+    def test_board_detail_budget(self):
+        self.assertEndpointBudget(reverse("board-detail", kwargs={"pk": self.board.pk}), BOARD_DETAIL_BUDGET)
@@ -0,0 +1,78 @@
+from django.contrib import admin
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal
+from goals.permissions import load_board_roles
+from goals.views import ChangesView, GoalListView
+from todolist.replicas import ReplicaMiddleware, ReplicaRouter, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def process(self, request, view) -> tuple[HttpResponse, str]:
+        """
+        Пропускает запрос через ReplicaMiddleware и возвращает ответ и базу, которую роутер выбрал бы для чтения
+        внутри view.
+        """
+        used = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            used.append(self.router.db_for_read(Goal))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        response = middleware(request)
+        return response, used[0]
+
+    def test_replica_router(self):
+        self.assertEqual(self.router.db_for_read(Goal), "default")
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(Goal), "replica_1")
+            self.assertEqual(self.router.db_for_write(Goal), "default")
+        finally:
+            replica_reads.reset(token)
+        self.assertFalse(self.router.allow_migrate("replica_1", "goals"))
+        self.assertTrue(self.router.allow_migrate("default", "goals"))
+
+    def test_replica_middleware(self):
+        _, db = self.process(self.factory.get("/goals/goal/list"), GoalListView.as_view())
+        self.assertEqual(db, "replica_1")
+        self.assertFalse(replica_reads.get())
+
+        # изменения и чтение сразу после них идут в основную БД
+        response, db = self.process(self.factory.patch("/goals/goal/1"), GoalListView.as_view())
+        self.assertEqual(db, "default")
+        self.assertIn("use_primary", response.cookies)
+
+        request = self.factory.get("/goals/goal/list", HTTP_COOKIE="use_primary=1")
+        self.assertEqual(self.process(request, GoalListView.as_view())[1], "default")
+
+        # журнал изменений и view других приложений читают из основной БД
+        self.assertEqual(self.process(self.factory.get("/goals/changes"), ChangesView.as_view())[1], "default")
+        self.assertEqual(self.process(self.factory.get("/admin/"), admin.site.index)[1], "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"], BOARD_ROLES_CACHE_TIMEOUT=60)
+class ReplicaRolesCacheTest(TransactionTestCase):
+    def test_cached_roles_read_from_primary(self):
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username="Arya", password="Arya_password")
+        board = Board.objects.create(title="Board_replica")
+        BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.reader)
+
+        # псевдоним replica_1 в тестах не настроен: запрос к реплике завершился бы ошибкой. TransactionTestCase нужен,
+        # потому что внутри транзакции роутер и так читает с default
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(load_board_roles(user.id), {board.pk: BoardParticipant.Role.reader})
+        finally:
+            replica_reads.reset(token)
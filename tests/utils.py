@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin(SimpleTestCase):
+    """
+    Добавляет в тест-кейс проверку бюджета SQL-запросов: assertQueryBudget падает, если блок кода выполнил больше
+    запросов, чем разрешено. Бюджет задается константой на эндпоинт и не зависит от количества строк в ответе,
+    поэтому появление N+1 запроса в сериализаторах или вьюшках ломает тесты.
+    """
+    @contextmanager
+    def assertQueryBudget(self, budget: int):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{number}. {query['sql']}" for number, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{queries}")
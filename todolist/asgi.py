@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# импорт после get_asgi_application: модулю нужны загруженные приложения
+from goals.events import BOARD_EVENTS_PATH, board_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # поток событий доски держит соединение открытым, поэтому обслуживается напрямую, минуя синхронные view Django
+    if scope['type'] == 'http' and (match := BOARD_EVENTS_PATH.match(scope['path'])):
+        await board_events(scope, receive, send, int(match['pk']))
+        return
+    await django_application(scope, receive, send)
@@ -0,0 +1,80 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_APPS = {"goals", "core", "bot"}
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Включается на время обработки безопасного запроса: только тогда чтение может идти с реплики.
+replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+class ReplicaRouter:
+    """
+    Роутер БД: запись всегда идет в default, чтение - на случайную реплику из DATABASE_REPLICAS, но только пока
+    включен replica_reads (безопасный запрос к view приложений goals, core, bot) и не открыта транзакция на default.
+    Фоновые команды, бот и запросы на изменение читают с основной БД. Реплики - физические копии default, поэтому
+    миграции на них не применяются, а связи между объектами из разных псевдонимов разрешены.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        if settings.DATABASE_REPLICAS and replica_reads.get() and not connections["default"].in_atomic_block:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints) -> str:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """
+    Включает чтение с реплик для безопасных запросов к view приложений goals, core и bot (кроме view с атрибутом
+    replica_reads = False). После успешного запроса на изменение клиент получает cookie REPLICA_PIN_COOKIE на
+    REPLICA_PIN_SECONDS секунд, и пока она есть, все его запросы читают с основной БД: клиент сразу видит свои
+    изменения, даже если реплика отстает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+            if getattr(request, "_replica_reads", False) and response.streaming:
+                response.streaming_content = self.stream_from_replica(response.streaming_content)
+        finally:
+            # значение выставляется без token.reset(): под ASGI process_view и __call__ выполняются в разных копиях
+            # контекста, а поток WSGI-воркера переиспользует контекст между запросами
+            replica_reads.set(False)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and settings.DATABASE_REPLICAS:
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite="Lax")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            return None
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        module = (view_class or view_func).__module__
+        if module.split(".")[0] in REPLICA_APPS and getattr(view_class, "replica_reads", True):
+            request._replica_reads = True
+            replica_reads.set(True)
+        return None
+
+    @staticmethod
+    def stream_from_replica(content):
+        # потоковый ответ читает данные уже после выхода из middleware
+        replica_reads.set(True)
+        try:
+            yield from content
+        finally:
+            replica_reads.set(False)
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'todolist.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +97,19 @@ DATABASES = {
     }
 }
 
+# Read replicas: every host in POSTGRES_REPLICA_HOSTS becomes a `replica_<n>` alias with the primary's credentials.
+# Safe requests to goals, core and bot views read from a random replica, writes and clients that wrote within the last
+# REPLICA_PIN_SECONDS use the primary. For a local setup with two aliases point POSTGRES_REPLICA_HOSTS at the primary
+# itself; in tests replicas mirror `default`.
+DATABASE_REPLICAS = []
+for index, host in enumerate(env.list('POSTGRES_REPLICA_HOSTS', default=[]), start=1):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['todolist.replicas.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'use_primary'
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -171,6 +185,52 @@ SOCIAL_AUTH_NEW_USER_REDIRECT_URL = '/logged-in/'
 SOCIAL_AUTH_USER_MODEL = 'core.User'
 
 BOT_TELEGRAM_TOKEN = env.str('BOT_TELEGRAM_TOKEN')
+BOT_API_URL = env.str('BOT_API_URL', default='https://api.telegram.org')
+# Threads handling bot messages: chats are processed in parallel up to this limit, each thread may hold a DB connection.
+BOT_WORKERS = env.int('BOT_WORKERS', default=32)
+# Outgoing messages per second for all chats and for a single chat (Telegram flood limits), and sending threads.
+BOT_SEND_RATE = env.float('BOT_SEND_RATE', default=30)
+BOT_CHAT_SEND_RATE = env.float('BOT_CHAT_SEND_RATE', default=1)
+BOT_SENDERS = env.int('BOT_SENDERS', default=8)
+# Seconds an unfinished dialog with the bot is kept, and chats whose state is cached in each bot process.
+BOT_STATE_TTL = env.int('BOT_STATE_TTL', default=3600)
+BOT_STATE_LRU_SIZE = env.int('BOT_STATE_LRU_SIZE', default=10000)
+# How the bot receives updates: 'polling' (the runbot command) or 'webhook' (Telegram posts them to /bot/webhook).
+BOT_DELIVERY_MODE = env.str('BOT_DELIVERY_MODE', default='polling')
+# Public HTTPS address of the webhook and the secret Telegram sends with every update (A-Z, a-z, 0-9, _ and -).
+BOT_WEBHOOK_URL = env.str('BOT_WEBHOOK_URL', default='')
+BOT_WEBHOOK_SECRET = env.str('BOT_WEBHOOK_SECRET', default='')
+# Accepted but not yet handled updates per process; above it Telegram gets 503 and delivers the update later.
+BOT_WEBHOOK_QUEUE_SIZE = env.int('BOT_WEBHOOK_QUEUE_SIZE', default=1000)
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': env.str('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('CACHE_LOCATION', default=''),
+    }
+}
+
+# Seconds to keep a user's board roles in the cache between requests, 0 disables the cross-request cache.
+# Enable only with a cache shared by all workers (Redis, Memcached): invalidation bumps a version key in that cache.
+BOARD_ROLES_CACHE_TIMEOUT = env.int('BOARD_ROLES_CACHE_TIMEOUT', default=0)
+
+# Days to keep the change log behind goals/changes (pruned by the prunechanges command); clients with an older cursor
+# have to sync in full.
+CHANGELOG_RETENTION_DAYS = env.int('CHANGELOG_RETENTION_DAYS', default=30)
+
+# Live board events (SSE, goals/board/<pk>/events): the in-process broker only reaches subscribers of the process that
+# made the change, goals.events.PostgresBroker delivers events between processes through LISTEN/NOTIFY.
+BOARD_EVENTS_BROKER = env.str('BOARD_EVENTS_BROKER', default='goals.events.InProcessBroker')
+# Seconds between keep-alive comments on an idle event stream.
+BOARD_EVENTS_HEARTBEAT = env.int('BOARD_EVENTS_HEARTBEAT', default=15)
+
+# Async read views (goals/async/...) run under uvicorn: one event loop per worker process accepts any number of
+# connections, while the blocking DRF/ORM work of each request runs in a shared pool of this many threads. The pool
+# size caps concurrent queries (and database connections) per process; extra requests wait in the event loop.
+# 0 runs each view in its request thread instead, like plain sync views under ASGI.
+ASYNC_VIEWS_THREADS = env.int('ASYNC_VIEWS_THREADS', default=16)
 
 
 # Logging